@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-import base64
 import logging
 import os
 import re
@@ -14,6 +13,11 @@ from uuid import uuid4
 import mcp.types as types
 from mcp.server.fastmcp import Context
 
+try:
+    from pybase64 import b64decode
+except ImportError:  # pybase64 ships with the optional "http" extra
+    from base64 import b64decode
+
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +25,7 @@ DEFAULT_OUTPUT_DIR = "/outputs"
 OUTPUT_URL_PREFIX = "/outputs"
 SESSION_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
 
-PLOT_TOOL_NAMES = {
+PLOT_TOOL_NAMES = frozenset({
     "plot_timeseries",
     "plot_bar_chart",
     "plot_histogram",
@@ -31,7 +35,7 @@ PLOT_TOOL_NAMES = {
     "plot_stackplot",
     "plot_ode_solution",
     "plot_pie_chart",
-}
+})
 
 
 def maybe_save_plot_output(
@@ -105,7 +109,7 @@ def _save_image_content(
 
     # Decode base64 image data
     try:
-        image_bytes = base64.b64decode(image.data)
+        image_bytes = b64decode(image.data)
     except Exception as exc:
         logger.error("Failed to decode image data: %s", exc)
         return None
@@ -1,20 +1,22 @@
 """Matplotlib-based visualization tools for data analysis."""
 
-import base64
 import io
 import json
 from typing import Annotated
 
 import matplotlib
 import matplotlib.colors as mcolors
-import matplotlib.pyplot as plt
 import matplotlib.ticker as ticker
 import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from mcp.types import ImageContent
 from pydantic import Field
 
-# Use non-interactive backend for server use
-matplotlib.use('Agg')
+try:
+    from pybase64 import b64encode
+except ImportError:  # pybase64 ships with the optional "http" extra
+    from base64 import b64encode
 
 # Font size constants
 VALUE_LABEL_FONTSIZE = 8
@@ -39,6 +41,44 @@ def _pixels_to_inches(size_px: tuple[int, int], dpi: int = FIGURE_DPI) -> tuple[
     """
     return (size_px[0] / dpi, size_px[1] / dpi)
 
+def _new_figure(figsize: tuple[int, int]):
+    """Create a figure and single axes on an Agg canvas, outside pyplot's global figure registry.
+
+    Nothing references the figure once the tool returns, so it is garbage
+    collected without plt.close().
+
+    Args:
+        figsize: Figure size in pixels as (width, height)
+
+    Returns:
+        Tuple of (figure, axes)
+    """
+    fig = Figure(figsize=_pixels_to_inches(figsize))
+    FigureCanvasAgg(fig)
+    return fig, fig.subplots()
+
+
+def _render(fig: Figure, output_format: str) -> ImageContent:
+    """Rasterize a finished figure and wrap it as ImageContent.
+
+    Every plot tool ends here, so tests that only exercise argument handling
+    can patch this out and skip rendering.
+
+    Args:
+        fig: Figure to save
+        output_format: 'png' or 'svg'
+
+    Returns:
+        ImageContent object with the encoded image
+    """
+    buf = io.BytesIO()
+    if output_format == 'svg':
+        fig.savefig(buf, format='svg', bbox_inches='tight')
+    else:
+        fig.savefig(buf, format='png', dpi=FIGURE_DPI, bbox_inches='tight')
+    return _create_image_content(buf, format=output_format)
+
+
 def _create_image_content(buf: io.BytesIO, format: str = 'png') -> ImageContent:
     """Helper to create ImageContent from BytesIO buffer.
     
@@ -49,8 +89,8 @@ def _create_image_content(buf: io.BytesIO, format: str = 'png') -> ImageContent:
     Returns:
         ImageContent object with appropriate mimeType
     """
-    buf.seek(0)
-    image_data = base64.b64encode(buf.read()).decode('utf-8')
+    # The base64 alphabet is ASCII, so the cheaper codec is exact
+    image_data = b64encode(buf.getvalue()).decode('ascii')
     mime_type = "image/png" if format == 'png' else "image/svg+xml"
     return ImageContent(
         type="image",
@@ -79,7 +119,7 @@ def _get_tab10_colors_no_yellow() -> list[str]:
         List of color strings from tab10 palette (9 colors, yellow excluded)
     """
     # Get tab10 colors as RGB tuples
-    tab10_rgb = plt.cm.tab10.colors
+    tab10_rgb = matplotlib.colormaps['tab10'].colors
     
     # Convert to hex and filter out yellow
     # Yellow in tab10 typically has high saturation and hue around 0.17 (60 degrees)
@@ -374,7 +414,7 @@ def tool_plot_timeseries(
             linestyles_list = linestyles_list[:num_series]
         
         # Create figure (convert pixels to inches)
-        fig, ax = plt.subplots(figsize=_pixels_to_inches(figsize))
+        fig, ax = _new_figure(figsize)
         
         # Determine which series go on primary vs secondary axis
         primary_series = {}
@@ -485,19 +525,9 @@ def tool_plot_timeseries(
             else:
                 ax.legend(loc=legend_loc)
         
-        # Save to memory buffer
-        buf = io.BytesIO()
-        if output_format == 'svg':
-            fig.savefig(buf, format='svg', bbox_inches='tight')
-        else:
-            fig.savefig(buf, format='png', dpi=FIGURE_DPI, bbox_inches='tight')
-        plt.close(fig)  # Free memory
-        
-        # Return ImageContent object
-        return _create_image_content(buf, format=output_format)
+        return _render(fig, output_format)
         
     except Exception as e:
-        plt.close('all')  # Clean up any figures
         raise ValueError(f"Error creating time series plot: {str(e)}")
 
 
@@ -572,7 +602,7 @@ def tool_plot_bar_chart(
             _validate_color(color)
         
         # Create figure (convert pixels to inches)
-        fig, ax = plt.subplots(figsize=_pixels_to_inches(figsize))
+        fig, ax = _new_figure(figsize)
         
         # Plot bars
         if horizontal:
@@ -584,7 +614,8 @@ def tool_plot_bar_chart(
             ax.set_xlabel(xlabel, fontsize=AXIS_LABEL_FONTSIZE)
             ax.set_ylabel(ylabel, fontsize=AXIS_LABEL_FONTSIZE)
             # Rotate x-axis labels
-            plt.xticks(rotation=xlabel_rotation, ha='right')
+            for label in ax.get_xticklabels():
+                label.set(rotation=xlabel_rotation, ha='right')
         
         # Add value labels on bars if requested
         if show_values:
@@ -636,19 +667,9 @@ def tool_plot_bar_chart(
             ax.grid(True, alpha=0.3, axis='y')
         # grid == False: no grid
         
-        # Save to memory buffer
-        buf = io.BytesIO()
-        if output_format == 'svg':
-            fig.savefig(buf, format='svg', bbox_inches='tight')
-        else:
-            fig.savefig(buf, format='png', dpi=FIGURE_DPI, bbox_inches='tight')
-        plt.close(fig)  # Free memory
-        
-        # Return ImageContent object
-        return _create_image_content(buf, format=output_format)
+        return _render(fig, output_format)
         
     except Exception as e:
-        plt.close('all')  # Clean up any figures
         raise ValueError(f"Error creating bar chart: {str(e)}")
 
 
@@ -707,7 +728,7 @@ def tool_plot_histogram(
             _validate_color(color)
         
         # Create figure (convert pixels to inches)
-        fig, ax = plt.subplots(figsize=_pixels_to_inches(figsize))
+        fig, ax = _new_figure(figsize)
         
         # Plot histogram
         n, bins_edges, patches = ax.hist(data, bins=bins, color=color, edgecolor='black', alpha=0.7)
@@ -743,19 +764,9 @@ def tool_plot_histogram(
                 bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5),
                 fontsize=ANNOTATION_FONTSIZE)
         
-        # Save to memory buffer
-        buf = io.BytesIO()
-        if output_format == 'svg':
-            fig.savefig(buf, format='svg', bbox_inches='tight')
-        else:
-            fig.savefig(buf, format='png', dpi=FIGURE_DPI, bbox_inches='tight')
-        plt.close(fig)  # Free memory
-        
-        # Return ImageContent object
-        return _create_image_content(buf, format=output_format)
+        return _render(fig, output_format)
         
     except Exception as e:
-        plt.close('all')  # Clean up any figures
         raise ValueError(f"Error creating histogram: {str(e)}")
 
 
@@ -817,7 +828,7 @@ def tool_plot_scatter(
             _validate_color(color)
         
         # Create figure (convert pixels to inches)
-        fig, ax = plt.subplots(figsize=_pixels_to_inches(figsize))
+        fig, ax = _new_figure(figsize)
         
         # Plot scatter
         ax.scatter(x_data, y_data, s=100, alpha=0.6, c=color, edgecolors='black', linewidth=1)
@@ -859,19 +870,9 @@ def tool_plot_scatter(
                    bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5),
                    fontsize=ANNOTATION_FONTSIZE)
         
-        # Save to memory buffer
-        buf = io.BytesIO()
-        if output_format == 'svg':
-            fig.savefig(buf, format='svg', bbox_inches='tight')
-        else:
-            fig.savefig(buf, format='png', dpi=FIGURE_DPI, bbox_inches='tight')
-        plt.close(fig)  # Free memory
-        
-        # Return ImageContent object
-        return _create_image_content(buf, format=output_format)
+        return _render(fig, output_format)
         
     except Exception as e:
-        plt.close('all')  # Clean up any figures
         raise ValueError(f"Error creating scatter plot: {str(e)}")
 
 
@@ -908,7 +909,7 @@ def tool_plot_heatmap(
             raise ValueError("data must be a list of lists")
         
         # Convert to numpy array for easier manipulation
-        data_array = np.array(data)
+        data_array = np.asarray(data, dtype=np.float64)
         if data_array.ndim != 2:
             raise ValueError("data must be 2-dimensional")
         
@@ -921,13 +922,13 @@ def tool_plot_heatmap(
             raise ValueError(f"y_labels has {len(y_labels)} items but data has {n_rows} rows")
         
         # Create figure (convert pixels to inches)
-        fig, ax = plt.subplots(figsize=_pixels_to_inches(figsize))
+        fig, ax = _new_figure(figsize)
         
         # Plot heatmap
         im = ax.imshow(data_array, cmap=colormap, aspect='auto')
         
         # Add colorbar
-        cbar = plt.colorbar(im, ax=ax)
+        cbar = fig.colorbar(im, ax=ax)
         cbar.ax.tick_params(labelsize=ANNOTATION_FONTSIZE)
         
         # Normalize and validate grid parameter
@@ -969,19 +970,9 @@ def tool_plot_heatmap(
                     ax.text(j, i, f'{data_array[i, j]:.1f}',
                             ha="center", va="center", color="w", fontsize=VALUE_LABEL_FONTSIZE)
         
-        # Save to memory buffer
-        buf = io.BytesIO()
-        if output_format == 'svg':
-            fig.savefig(buf, format='svg', bbox_inches='tight')
-        else:
-            fig.savefig(buf, format='png', dpi=FIGURE_DPI, bbox_inches='tight')
-        plt.close(fig)  # Free memory
-        
-        # Return ImageContent object
-        return _create_image_content(buf, format=output_format)
+        return _render(fig, output_format)
         
     except Exception as e:
-        plt.close('all')  # Clean up any figures
         raise ValueError(f"Error creating heatmap: {str(e)}")
 
 
@@ -1075,7 +1066,7 @@ def tool_plot_stacked_bar(
             colors = [tab10_colors[i % len(tab10_colors)] for i in range(num_series)]
         
         # Create figure (convert pixels to inches)
-        fig, ax = plt.subplots(figsize=_pixels_to_inches(figsize))
+        fig, ax = _new_figure(figsize)
         
         # Prepare data for stacking
         series_data = [series[name] for name in series_names]
@@ -1169,24 +1160,14 @@ def tool_plot_stacked_bar(
             ax.grid(True, alpha=0.3, axis='y')
         # grid == False: no grid
         
-        # Save to memory buffer
-        buf = io.BytesIO()
-        if output_format == 'svg':
-            fig.savefig(buf, format='svg', bbox_inches='tight')
-        else:
-            fig.savefig(buf, format='png', dpi=FIGURE_DPI, bbox_inches='tight')
-        plt.close(fig)  # Free memory
-        
-        # Return ImageContent object
-        return _create_image_content(buf, format=output_format)
+        return _render(fig, output_format)
         
     except Exception as e:
-        plt.close('all')  # Clean up any figures
         raise ValueError(f"Error creating stacked bar chart: {str(e)}")
 
 
 def tool_plot_ode_solution(
-    ode_result: Annotated[str, Field(description="JSON string output from the solve_ode tool. Must contain 't' (time points) and variable arrays.")],
+    ode_result: Annotated[str, Field(description="JSON string output from the solve_ode tool ('time' plus a 'state' object of variable arrays), or an object with 't' (time points) and variable arrays.")],
     title: Annotated[str | None, Field(description="Title for the plot. If None, uses 'ODE Solution'.")] = None,
     figsize: Annotated[tuple[int, int], Field(description="Figure size in pixels as (width, height).")] = DEFAULT_FIGSIZE_PX,
     colors: Annotated[list[str] | None, Field(description="List of named colors or hex values. If None, uses tab10 palette (excluding yellow). If provided but shorter than series count, pads with unused tab10 colors using HSV distance.")] = None,
@@ -1206,6 +1187,7 @@ def tool_plot_ode_solution(
     - Comparing multiple solution variables over time
     
     Examples:
+    - ode_result='{"time": [0, 1, 2], "state": {"x": [1, 0.5, 0.25]}, "success": true}'
     - ode_result='{"t": [0, 1, 2], "x": [1, 0.5, 0.25], "success": true}'
     """
     try:
@@ -1219,6 +1201,9 @@ def tool_plot_ode_solution(
         # Validate result structure
         if not isinstance(result, dict):
             raise ValueError("ode_result must be a JSON object")
+        # Flatten solve_ode's {"time": [...], "state": {...}} layout
+        if 'time' in result and isinstance(result.get('state'), dict):
+            result = {'t': result['time'], **result['state']}
         if 't' not in result:
             raise ValueError("ode_result must contain 't' (time) array")
         
@@ -1228,7 +1213,7 @@ def tool_plot_ode_solution(
             raise ValueError("Time array 't' cannot be empty")
         
         # Find all variable arrays (anything that's not 't', 'success', 'method', etc.)
-        metadata_keys = {'t', 'success', 'method', 'n_points'}
+        metadata_keys = {'t', 'success', 'method', 'message', 'n_points'}
         variable_names = [key for key in result.keys() if key not in metadata_keys]
         
         if not variable_names:
@@ -1291,7 +1276,7 @@ def tool_plot_ode_solution(
             linestyles_list = linestyles_list[:num_variables]
         
         # Create figure (convert pixels to inches)
-        fig, ax = plt.subplots(figsize=_pixels_to_inches(figsize))
+        fig, ax = _new_figure(figsize)
         
         # Determine which variables go on primary vs secondary axis
         primary_vars = {}
@@ -1381,22 +1366,11 @@ def tool_plot_ode_solution(
                    bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5),
                    fontsize=ANNOTATION_FONTSIZE)
         
-        # Save to memory buffer
-        buf = io.BytesIO()
-        if output_format == 'svg':
-            fig.savefig(buf, format='svg', bbox_inches='tight')
-        else:
-            fig.savefig(buf, format='png', dpi=FIGURE_DPI, bbox_inches='tight')
-        plt.close(fig)  # Free memory
-        
-        # Return ImageContent object
-        return _create_image_content(buf, format=output_format)
+        return _render(fig, output_format)
         
     except json.JSONDecodeError as e:
-        plt.close('all')
         raise ValueError(f"Invalid JSON in ode_result: {str(e)}")
     except Exception as e:
-        plt.close('all')  # Clean up any figures
         raise ValueError(f"Error creating ODE solution plot: {str(e)}")
 
 
@@ -1484,7 +1458,7 @@ def tool_plot_stackplot(
             colors = [tab10_colors[i % len(tab10_colors)] for i in range(num_series)]
         
         # Create figure (convert pixels to inches)
-        fig, ax = plt.subplots(figsize=_pixels_to_inches(figsize))
+        fig, ax = _new_figure(figsize)
         
         # Prepare data for stacking - need to convert to arrays
         series_data = [series[name] for name in series_names]
@@ -1507,7 +1481,8 @@ def tool_plot_stackplot(
             ax.set_xticklabels(x_data, rotation=xlabel_rotation, ha='right')
         elif xlabel_rotation != 0:
             # Apply rotation even for numeric labels if requested
-            plt.xticks(rotation=xlabel_rotation, ha='right')
+            for label in ax.get_xticklabels():
+                label.set(rotation=xlabel_rotation, ha='right')
         
         # Set axis limits
         if xlim is not None:
@@ -1534,19 +1509,9 @@ def tool_plot_stackplot(
             ax.grid(True, alpha=0.3, axis='y')
         # grid == False: no grid
         
-        # Save to memory buffer
-        buf = io.BytesIO()
-        if output_format == 'svg':
-            fig.savefig(buf, format='svg', bbox_inches='tight')
-        else:
-            fig.savefig(buf, format='png', dpi=FIGURE_DPI, bbox_inches='tight')
-        plt.close(fig)  # Free memory
-        
-        # Return ImageContent object
-        return _create_image_content(buf, format=output_format)
+        return _render(fig, output_format)
         
     except Exception as e:
-        plt.close('all')  # Clean up any figures
         raise ValueError(f"Error creating stackplot: {str(e)}")
 
 
@@ -1620,7 +1585,7 @@ def tool_plot_pie_chart(
             colors = [tab10_colors[i % len(tab10_colors)] for i in range(num_slices)]
         
         # Create figure (convert pixels to inches)
-        fig, ax = plt.subplots(figsize=_pixels_to_inches(figsize))
+        fig, ax = _new_figure(figsize)
         
         # Plot pie chart
         wedges, texts, autotexts = ax.pie(
@@ -1651,19 +1616,9 @@ def tool_plot_pie_chart(
         # Equal aspect ratio ensures pie is drawn as a circle
         ax.axis('equal')
         
-        # Save to memory buffer
-        buf = io.BytesIO()
-        if output_format == 'svg':
-            fig.savefig(buf, format='svg', bbox_inches='tight')
-        else:
-            fig.savefig(buf, format='png', dpi=FIGURE_DPI, bbox_inches='tight')
-        plt.close(fig)  # Free memory
-        
-        # Return ImageContent object
-        return _create_image_content(buf, format=output_format)
+        return _render(fig, output_format)
         
     except Exception as e:
-        plt.close('all')  # Clean up any figures
         raise ValueError(f"Error creating pie chart: {str(e)}")
 
 
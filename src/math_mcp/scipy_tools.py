@@ -10,7 +10,7 @@ from scipy.optimize import root_scalar
 from sympy import diff, symbols
 from sympy.core.sympify import SympifyError
 
-from math_mcp.utils import parse_expr
+from math_mcp.utils import dumps_json, parse_expr
 
 
 # Tool function implementations (exported for testing)
@@ -120,7 +120,7 @@ def tool_solve_ode(
             if method_lower == "euler":
                 dt = 0.01  # Fixed step size
                 t_points = np.arange(t_start, t_end + dt, dt)
-                y_points = np.zeros((len(t_points), len(state_vars)))
+                y_points = np.empty((len(t_points), len(state_vars)))
                 y_points[0] = y0
                 
                 for i in range(1, len(t_points)):
@@ -133,13 +133,13 @@ def tool_solve_ode(
                     "method": "euler",
                     "success": True,
                 }
-                return json.dumps(result)
+                return dumps_json(result)
             
             # For RK4 method, use a fixed-step RK4 implementation
             if method_lower == "rk4":
                 dt = 0.01  # Fixed step size
                 t_points = np.arange(t_start, t_end + dt, dt)
-                y_points = np.zeros((len(t_points), len(state_vars)))
+                y_points = np.empty((len(t_points), len(state_vars)))
                 y_points[0] = y0
                 
                 for i in range(1, len(t_points)):
@@ -161,7 +161,7 @@ def tool_solve_ode(
                     "method": "rk4",
                     "success": True,
                 }
-                return json.dumps(result)
+                return dumps_json(result)
             
             # Use scipy for adaptive methods (rk45)
             scipy_method = method_map.get(method_lower, "RK45")
@@ -187,7 +187,7 @@ def tool_solve_ode(
                 "message": sol.message,
             }
             
-            return json.dumps(result)
+            return dumps_json(result)
         except Exception as e:
             return f"Error: {str(e)}"
 
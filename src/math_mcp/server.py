@@ -1,19 +1,41 @@
 """Math MCP Server - Symbolic math via SymPy."""
 
+import asyncio
+import contextlib
+import logging
 import os
-from datetime import datetime, timedelta
+import threading
+import time
 
 import mcp.types as types
 from mcp.server.fastmcp import FastMCP
 from mcp.server.transport_security import TransportSecuritySettings
 from starlette.applications import Starlette
+from starlette.responses import JSONResponse
 from starlette.routing import Mount
 from starlette.staticfiles import StaticFiles
 
-from math_mcp import batch_tools, plot_output, plotting_tools, scipy_tools, stats_tools, sympy_tools, unit_tools
+from math_mcp import (
+    batch_tools,
+    plot_output,
+    plotting_tools,
+    scipy_tools,
+    stats_kernels,
+    stats_tools,
+    sympy_tools,
+    unit_tools,
+)
+
+try:
+    import orjson
+except ImportError:  # orjson ships with the optional "http" extra
+    orjson = None
+
+logger = logging.getLogger(__name__)
 
 # Default configuration constants
 DEFAULT_TRANSPORT = "stdio"
+HTTP_TRANSPORTS = ("http", "streamable-http")
 DEFAULT_HTTP_HOST = "0.0.0.0"
 DEFAULT_HTTP_PORT = "8008"
 DEFAULT_ALLOWED_HOSTS = "*"
@@ -40,88 +62,118 @@ transport_security = TransportSecuritySettings(
     allowed_hosts=allowed_hosts
 )
 
+# Current SDKs leave CallToolResult mutable, which lets the plot URL handler
+# replace its content in place; a frozen model needs a model_copy rebuild.
+_CTR_MUTABLE = not types.CallToolResult.model_config.get("frozen", False)
+# Direct assignment skips validation, so build content with the container type
+# the model declares (list in current SDKs) instead of checking per call.
+_CONTENT_CAST = (
+    tuple if "tuple" in str(types.CallToolResult.model_fields["content"].annotation) else list
+)
+
+
 def _attach_plot_url_handler(app: FastMCP) -> None:
     """Attach handler to save plot outputs to disk.
     
     This intercepts tool call results for plot tools and saves the image to disk.
     URLs can be retrieved via the separate /plot-urls endpoint.
+    Attaching twice to the same app is a no-op, so module reloads do not stack
+    extra post-processing layers.
     """
-    # Get the original handler
-    original_handler = app._mcp_server.request_handlers.get(types.CallToolRequest)
+    if getattr(app._mcp_server, "_plot_url_handler_installed", False):
+        return
+    app._mcp_server._plot_url_handler_installed = True
     
-    async def handler(req: types.CallToolRequest):
-        # Call the original handler (or default FastMCP handler)
-        if original_handler:
-            result = await original_handler(req)
-        else:
-            # Fallback: use FastMCP's default tool call mechanism
-            try:
-                tool_result = await app.call_tool(
-                    req.params.name, (req.params.arguments or {})
-                )
-                # FastMCP returns a list of content items
-                content = list(tool_result) if isinstance(tool_result, (list, tuple)) else [tool_result]
-                result = types.ServerResult(
-                    types.CallToolResult(content=content, isError=False)
-                )
-            except Exception as exc:
-                result = types.ServerResult(
-                    types.CallToolResult(
-                        content=[types.TextContent(type="text", text=str(exc))],
-                        isError=True,
-                    )
+    # Captured in the closure so the per-call membership test is a local lookup
+    plot_names = frozenset(plot_output.PLOT_TOOL_NAMES)
+    text_content = types.TextContent
+    
+    async def fallback_handler(req: types.CallToolRequest):
+        # Fallback: use FastMCP's default tool call mechanism
+        params = req.params
+        try:
+            tool_result = await app.call_tool(params.name, params.arguments or {})
+            # FastMCP returns a list of content items; pass sequences
+            # through as-is since CallToolResult validation builds its own list
+            content = tool_result if isinstance(tool_result, (list, tuple)) else [tool_result]
+            return types.ServerResult(
+                types.CallToolResult(content=content, isError=False)
+            )
+        except Exception as exc:
+            return types.ServerResult(
+                types.CallToolResult(
+                    content=[text_content(type="text", text=str(exc))],
+                    isError=True,
                 )
+            )
+    
+    # Resolve the handler to wrap once here rather than branching on every call
+    original_handler = (
+        app._mcp_server.request_handlers.get(types.CallToolRequest) or fallback_handler
+    )
+    
+    async def handler(req: types.CallToolRequest):
+        name = req.params.name
+        result = await original_handler(req)
+        
+        # Non-plot tools are the common case; return before touching the result
+        if name not in plot_names:
+            return result
+        call_result = result.root
+        if call_result.isError:
+            return result
         
         # Post-process: save plot files and add URL to response
-        if not result.root.isError and req.params.name in plot_output.PLOT_TOOL_NAMES:
-            try:
-                # Extract content from result (ServerResult.root contains CallToolResult)
-                original_content = result.root.content
-                content = list(original_content) if original_content else []
-                
-                # Save plot to file and get URL
-                url = plot_output.maybe_save_plot_output(content, app.get_context())
-                
-                # Add URL as text content if file was saved
-                if url:
-                    # Add URL text to content list
-                    url_text = types.TextContent(
-                        type="text",
-                        text=f"Chart available at: {url}"
-                    )
-                    content.append(url_text)
-                    
-                    # Update the result in place by modifying the content directly
-                    # FastMCP should serialize the updated content
-                    if hasattr(result.root, 'content'):
-                        # Try to update content directly if it's mutable
-                        try:
-                            result.root.content = tuple(content) if isinstance(result.root.content, tuple) else content
-                        except (AttributeError, TypeError):
-                            # If direct assignment doesn't work, create new objects
-                            updated_result = result.root.model_copy(update={"content": tuple(content) if isinstance(original_content, tuple) else content})
-                            result = result.model_copy(update={"root": updated_result})
-            except Exception as exc:
-                # Log error but don't fail the request
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.warning(f"Failed to save plot output: {exc}", exc_info=True)
+        try:
+            # Extract content from result (ServerResult.root contains CallToolResult)
+            original_content = call_result.content or []
+            
+            # Save plot to file and get URL
+            url = plot_output.maybe_save_plot_output(original_content, app.get_context())
+            
+            # Add URL as text content if file was saved
+            if url:
+                url_text = text_content(
+                    type="text",
+                    text=f"Chart available at: {url}"
+                )
+                content = _CONTENT_CAST((*original_content, url_text))
+                if _CTR_MUTABLE:
+                    call_result.content = content
+                else:
+                    updated_result = call_result.model_copy(update={"content": content})
+                    result = result.model_copy(update={"root": updated_result})
+        except Exception as exc:
+            # Log error but don't fail the request
+            logger.warning("Failed to save plot output: %s", exc, exc_info=True)
         
         return result
 
     app._mcp_server.request_handlers[types.CallToolRequest] = handler
 
 
-# Module-level storage for plot URLs (session_id -> (url, timestamp))
-_plot_urls: dict[str, tuple[str, datetime]] = {}
-_cleanup_interval = timedelta(hours=1)
+# Module-level storage for plot URLs (session_id -> (url, expires_at)), where
+# expires_at is a time.monotonic() deadline
+_plot_urls: dict[str, tuple[str, float]] = {}
+_plot_url_ttl_seconds = 3600.0
+_plot_url_cleanup_interval_seconds = 60.0
+# Pre-serialized body for the common "no URL yet" response
+_MISS_RESPONSE_BODY = b'{"url":null}'
+
+
+class _ORJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson when it is installed."""
+
+    def render(self, content) -> bytes:
+        if orjson is None:
+            return super().render(content)
+        return orjson.dumps(content)
 
 
 def _create_plot_url_endpoint():
     """Create a simple endpoint to get the most recent plot URL for a session."""
-    from starlette.responses import JSONResponse
+    from starlette.responses import Response
     from starlette.requests import Request
-    from datetime import datetime
     
     async def get_plot_url(request: Request):
         """Get the most recent plot URL for the session."""
@@ -129,21 +181,50 @@ def _create_plot_url_endpoint():
         if not session_id:
             return JSONResponse({"error": "session_id required"}, status_code=400)
         
-        # Clean up old entries
-        now = datetime.now()
-        expired = [sid for sid, (_, timestamp) in _plot_urls.items() 
-                  if now - timestamp > _cleanup_interval]
-        for sid in expired:
-            _plot_urls.pop(sid, None)
-        
-        url, _ = _plot_urls.get(session_id, (None, None))
-        if url:
-            return JSONResponse({"url": url})
-        return JSONResponse({"url": None})
+        # Expired entries are swept by the lifespan cleanup task; only
+        # guard against serving one that has not been swept yet
+        entry = _plot_urls.get(session_id)
+        if entry is None or entry[1] <= time.monotonic():
+            return Response(_MISS_RESPONSE_BODY, media_type="application/json")
+        return _ORJSONResponse({"url": entry[0]})
     
     return get_plot_url
 
 
+def _purge_expired_plot_urls(now: float) -> None:
+    """Remove plot URL entries whose deadline has passed."""
+    expired = [sid for sid, (_, expires_at) in _plot_urls.items() if expires_at <= now]
+    for sid in expired:
+        _plot_urls.pop(sid, None)
+
+
+async def _periodic_plot_url_cleanup() -> None:
+    """Sweep expired plot URLs off the request path, once per cleanup interval."""
+    while True:
+        await asyncio.sleep(_plot_url_cleanup_interval_seconds)
+        _purge_expired_plot_urls(time.monotonic())
+
+
+def _with_plot_url_cleanup(lifespan=None):
+    """Extend a Starlette lifespan with the periodic plot URL cleanup task."""
+
+    @contextlib.asynccontextmanager
+    async def _lifespan(app):
+        cleanup_task = asyncio.create_task(_periodic_plot_url_cleanup())
+        try:
+            if lifespan is None:
+                yield
+            else:
+                async with lifespan(app) as state:
+                    yield state
+        finally:
+            cleanup_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await cleanup_task
+
+    return _lifespan
+
+
 def _wrap_http_app(app: object, *, lifespan=None) -> Starlette:
     """Wrap the MCP streamable HTTP app with /outputs and /plot-urls endpoints.
 
@@ -152,6 +233,7 @@ def _wrap_http_app(app: object, *, lifespan=None) -> Starlette:
     lifespan. When we mount the MCP app under a new root Starlette, only the root
     app's lifespan runs—the mounted app's lifespan is not invoked. So we must pass
     the MCP app's lifespan into the root Starlette so the task group is initialized.
+    The root lifespan also runs the periodic /plot-urls cleanup task.
     """
     from starlette.routing import Route
     
@@ -170,7 +252,18 @@ def _wrap_http_app(app: object, *, lifespan=None) -> Starlette:
         Route("/plot-urls", get_plot_url, methods=["GET"]),
         Mount("/", app=app),
     ]
-    return Starlette(routes=routes, lifespan=lifespan) if lifespan else Starlette(routes=routes)
+    return Starlette(routes=routes, lifespan=_with_plot_url_cleanup(lifespan))
+
+
+def _start_kernel_warm_up() -> None:
+    """Compile the Numba stats kernels on a daemon thread when numba is installed.
+
+    Startup does not wait for it; a large request arriving first compiles the
+    kernel it needs, as it would without the warm-up.
+    """
+    if not stats_kernels.HAS_NUMBA:
+        return
+    threading.Thread(target=stats_kernels.warm_up, name="math-mcp-kernel-warm-up", daemon=True).start()
 
 
 # Create FastMCP instance with transport security settings
@@ -182,7 +275,6 @@ unit_tools.register_unit_tools(mcp)
 scipy_tools.register_scipy_tools(mcp)
 stats_tools.register_stats_tools(mcp)
 plotting_tools.register_plotting_tools(mcp)
-_attach_plot_url_handler(mcp)
 batch_tools.register_batch_tools(mcp)
 
 
@@ -200,8 +292,9 @@ def main():
     
     try:
         transport = os.getenv("MCP_TRANSPORT", DEFAULT_TRANSPORT).lower()
+        _start_kernel_warm_up()
         
-        if transport in ("http", "streamable-http"):
+        if transport in HTTP_TRANSPORTS:
             # Get configuration from environment variables
             host = os.getenv("MCP_HOST", DEFAULT_HTTP_HOST)
             port_str = os.getenv("MCP_PORT", DEFAULT_HTTP_PORT)
@@ -217,6 +310,9 @@ def main():
             print(f"[math-mcp] DNS rebinding protection: {transport_security.enable_dns_rebinding_protection}", file=sys.stderr)
             print(f"[math-mcp] Allowed hosts: {transport_security.allowed_hosts}", file=sys.stderr)
             
+            # Plot files are only served over HTTP; stdio has no base URL to save them under
+            _attach_plot_url_handler(mcp)
+            
             # Use streamable HTTP app with session management
             # Single endpoint (/mcp) handles both streaming and JSON-RPC messages
             # streamable_http_app returns a Starlette app. Its lifespan runs
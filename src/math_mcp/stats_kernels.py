@@ -0,0 +1,172 @@
+"""Numba-compiled kernels for the statistical tools.
+
+Numba is optional (the ``fast`` extra). Without it, ``njit`` is a no-op and
+HAS_NUMBA is False, so every kernel here must also run as plain Python. Callers
+use HAS_NUMBA to decide whether a kernel beats their NumPy path.
+
+Kernels are declared without signatures, so importing this module compiles
+nothing. The server calls warm_up() on a background thread at startup, which
+keeps JIT latency off the first large request without delaying startup. A
+kernel called before the warm-up finishes compiles on that first call, as it
+would with no warm-up. ``cache=True`` reloads the machine code from disk on
+later starts. fastmath is deliberately off so NaN/inf propagate exactly as they
+do on the NumPy path.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+
+    HAS_NUMBA = True
+except ImportError:  # numba ships with the optional "fast" extra
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit when numba is not installed."""
+
+        def decorator(func):
+            return func
+
+        return decorator
+
+    prange = range
+
+
+# Inputs below this size stay on the NumPy path, where a single compiled pass
+# does not pay for the kernel dispatch overhead
+NUMBA_MIN_SIZE = 10_000
+
+
+@njit(cache=True)
+def describe_moments(arr):
+    """Single-pass mean, sample variance, min and max using Welford's algorithm.
+
+    Args:
+        arr: Non-empty 1-D float64 array
+
+    Returns:
+        Tuple of (mean, variance, min, max); variance uses ddof=1 and is 0.0
+        for a single value. Min and max are NaN if any value is, as with
+        np.min/np.max.
+    """
+    count = 0
+    mean = 0.0
+    m2 = 0.0
+    min_val = arr[0]
+    max_val = arr[0]
+    has_nan = False
+    for x in arr:
+        count += 1
+        delta = x - mean
+        mean += delta / count
+        m2 += (x - mean) * delta
+        if x != x:
+            # Both comparisons below are false for NaN
+            has_nan = True
+        elif x < min_val:
+            min_val = x
+        elif x > max_val:
+            max_val = x
+    if has_nan:
+        min_val = np.nan
+        max_val = np.nan
+    variance = m2 / (count - 1) if count > 1 else 0.0
+    return mean, variance, min_val, max_val
+
+
+@njit(cache=True)
+def ewma(arr, alpha):
+    """Exponentially weighted moving average seeded with the first value.
+
+    Args:
+        arr: Non-empty 1-D float64 array
+        alpha: Smoothing factor in (0, 1]
+
+    Returns:
+        Array of the same length as ``arr``
+    """
+    smoothed = np.empty_like(arr)
+    smoothed[0] = arr[0]
+    for i in range(1, len(arr)):
+        smoothed[i] = alpha * arr[i] + (1 - alpha) * smoothed[i - 1]
+    return smoothed
+
+
+@njit(parallel=True, cache=True)
+def _mean_and_ssd(arr):
+    """Mean and sum of squared deviations, as two parallel reductions."""
+    n = len(arr)
+    total = 0.0
+    for i in prange(n):
+        total += arr[i]
+    mean = total / n
+    ssd = 0.0
+    for i in prange(n):
+        d = arr[i] - mean
+        ssd += d * d
+    return mean, ssd
+
+
+@njit(cache=True)
+def ttest_ind_statistic(a, b):
+    """Two-sample Student's t statistic with pooled variance (SciPy's equal_var=True).
+
+    Args:
+        a: Non-empty 1-D float64 array
+        b: Non-empty 1-D float64 array; len(a) + len(b) must exceed 2
+
+    Returns:
+        The t statistic; +/-inf or nan when both samples have zero variance,
+        matching scipy.stats.ttest_ind.
+    """
+    n1 = len(a)
+    n2 = len(b)
+    mean1, ssd1 = _mean_and_ssd(a)
+    mean2, ssd2 = _mean_and_ssd(b)
+    pooled_var = (ssd1 + ssd2) / (n1 + n2 - 2)
+    denom = np.sqrt(pooled_var * (1.0 / n1 + 1.0 / n2))
+    diff = mean1 - mean2
+    if denom == 0.0:
+        if diff == 0.0:
+            return np.nan
+        return np.inf if diff > 0.0 else -np.inf
+    return diff / denom
+
+
+@njit(cache=True)
+def regression_moments(x, y):
+    """Single-pass means and centered sums of squares/products (Welford co-moments).
+
+    Args:
+        x: Non-empty 1-D float64 array
+        y: 1-D float64 array of the same length
+
+    Returns:
+        Tuple of (x_mean, y_mean, ssx, ssy, ssxy), where the sums are taken
+        about the means.
+    """
+    x_mean = 0.0
+    y_mean = 0.0
+    ssx = 0.0
+    ssy = 0.0
+    ssxy = 0.0
+    for i in range(len(x)):
+        count = i + 1
+        dx = x[i] - x_mean
+        dy = y[i] - y_mean
+        x_mean += dx / count
+        y_mean += dy / count
+        ssx += dx * (x[i] - x_mean)
+        ssy += dy * (y[i] - y_mean)
+        ssxy += dx * (y[i] - y_mean)
+    return x_mean, y_mean, ssx, ssy, ssxy
+
+
+def warm_up():
+    """Compile every kernel by calling it once on a tiny float64 input."""
+    sample = np.array([1.0, 2.0, 3.0])
+    describe_moments(sample)
+    ewma(sample, 0.5)
+    ttest_ind_statistic(sample, sample)
+    regression_moments(sample, sample)
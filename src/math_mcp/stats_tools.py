@@ -1,12 +1,173 @@
 """Statistical analysis tools using scipy.stats."""
 
-import json
+import math
 from typing import Annotated
 
 import numpy as np
 from pydantic import Field
 from scipy import stats
-from scipy.stats import linregress
+from scipy.special import stdtr
+
+from math_mcp import stats_kernels
+from math_mcp.utils import dumps_json
+
+# Quantiles reported by describe_data, and the size from which selecting their
+# neighbouring order statistics with np.partition beats np.percentile
+_DESCRIBE_QUANTILES = np.array([0.25, 0.50, 0.75, 0.95, 0.99])
+_PARTITION_MIN_SIZE = 256
+# Below this size describe_data stays in pure Python and skips NumPy entirely
+_PURE_PYTHON_MAX_SIZE = 32
+
+
+def _moments(arr):
+    """Mean, sample variance, min and max of an array of 2+ values."""
+    if stats_kernels.HAS_NUMBA and len(arr) >= stats_kernels.NUMBA_MIN_SIZE:
+        # One compiled pass instead of separate mean/var/min/max passes
+        return tuple(float(v) for v in stats_kernels.describe_moments(arr))
+    return float(np.mean(arr)), float(np.var(arr, ddof=1)), float(arr.min()), float(arr.max())
+
+
+def _pairwise_sum(values):
+    """Sum a list of up to 128 floats in the same order as NumPy's add.reduce.
+
+    NumPy adds short inputs sequentially and longer ones in eight interleaved
+    partial sums, so matching that order keeps results bit-identical to np.mean
+    and np.var; overflow gives inf and NaN propagates, as with NumPy.
+    """
+    n = len(values)
+    if n < 8:
+        total = -0.0
+        for x in values:
+            total += x
+        return total
+    partial = values[:8]
+    i = 8
+    while i < n - n % 8:
+        for j in range(8):
+            partial[j] += values[i + j]
+        i += 8
+    total = ((partial[0] + partial[1]) + (partial[2] + partial[3])) + (
+        (partial[4] + partial[5]) + (partial[6] + partial[7])
+    )
+    for x in values[i:]:
+        total += x
+    return total
+
+
+def _sorted_percentiles(ordered):
+    """Same quantiles as _percentiles, interpolated from an already-sorted sequence."""
+    last = len(ordered) - 1
+    result = []
+    for q in _DESCRIBE_QUANTILES.tolist():
+        position = q * last
+        lower = int(position)
+        upper = min(lower + 1, last)
+        weight = position - lower
+        diff = ordered[upper] - ordered[lower]
+        # Interpolate from the nearer neighbour, as np.percentile does
+        if weight >= 0.5:
+            result.append(float(ordered[upper] - diff * (1 - weight)))
+        else:
+            result.append(float(ordered[lower] + diff * weight))
+    return result
+
+
+def _percentiles(arr):
+    """p25/p50/p75/p95/p99 with np.percentile's default linear interpolation."""
+    n = len(arr)
+    # np.partition moves NaN to the end, which would leave the lower
+    # percentiles finite; np.percentile reports NaN for all of them
+    if n < _PARTITION_MIN_SIZE or np.isnan(arr).any():
+        return [float(p) for p in np.percentile(arr, _DESCRIBE_QUANTILES * 100)]
+    positions = _DESCRIBE_QUANTILES * (n - 1)
+    lower = positions.astype(np.intp)
+    upper = np.minimum(lower + 1, n - 1)
+    part = np.partition(arr, np.union1d(lower, upper))
+    below = part[lower]
+    above = part[upper]
+    weights = positions - lower
+    diff = above - below
+    # Interpolate from the nearer neighbour, as np.percentile does
+    return np.where(weights >= 0.5, above - diff * (1 - weights), below + diff * weights).tolist()
+
+
+def _pearsonr(arr_x, arr_y):
+    """Pearson r and two-sided p-value in closed form, matching scipy.stats.pearsonr.
+
+    Avoids pearsonr's validation and wrapper overhead, which dominates for the
+    short series these tools usually receive.
+    """
+    n = len(arr_x)
+    if n < 2:
+        raise ValueError("x and y must have length at least 2.")
+    dx = arr_x - arr_x.mean()
+    dy = arr_y - arr_y.mean()
+    # Scale the deviations to at most 1 in magnitude, as pearsonr does, so the
+    # sums of squares cannot overflow for large-magnitude input
+    x_scale = float(np.abs(dx).max())
+    y_scale = float(np.abs(dy).max())
+    if x_scale == 0.0 or y_scale == 0.0:
+        # Constant input: correlation is undefined
+        return math.nan, math.nan
+    dx = dx / x_scale
+    dy = dy / y_scale
+    r = float(np.dot(dx, dy)) / math.sqrt(float(np.dot(dx, dx)) * float(np.dot(dy, dy)))
+    if not math.isfinite(r):
+        # NaN/inf in the input; min/max would turn NaN into a perfect correlation
+        return math.nan, math.nan
+    r = max(-1.0, min(1.0, r))
+    if n == 2:
+        return r, 1.0
+    if abs(r) == 1.0:
+        return r, 0.0
+    t = r * math.sqrt((n - 2) / (1.0 - r * r))
+    return r, float(2.0 * stdtr(n - 2, -abs(t)))
+
+
+def _linregress(arr_x, arr_y):
+    """Least-squares line in closed form, matching scipy.stats.linregress.
+
+    Uses centered sums of squares (one compiled pass for large inputs when numba
+    is available) rather than linregress's covariance-matrix route.
+
+    Returns:
+        Tuple of (slope, intercept, rvalue, pvalue) as floats
+    """
+    n = len(arr_x)
+    if stats_kernels.HAS_NUMBA and n >= stats_kernels.NUMBA_MIN_SIZE:
+        x_mean, y_mean, ssx, ssy, ssxy = (
+            float(v) for v in stats_kernels.regression_moments(arr_x, arr_y)
+        )
+    else:
+        x_mean = float(arr_x.mean())
+        y_mean = float(arr_y.mean())
+        dx = arr_x - x_mean
+        dy = arr_y - y_mean
+        ssx = float(dx @ dx)
+        ssy = float(dy @ dy)
+        ssxy = float(dx @ dy)
+    if ssx == 0.0:
+        raise ValueError("Cannot calculate a linear regression if all x values are identical")
+
+    slope = ssxy / ssx
+    intercept = y_mean - slope * x_mean
+    if ssy == 0.0:
+        rvalue = math.nan if ssxy == 0.0 else 0.0
+    else:
+        rvalue = ssxy / (math.sqrt(ssx) * math.sqrt(ssy))
+        if not math.isfinite(rvalue):
+            # NaN/inf in the input; min/max would turn NaN into a perfect fit
+            return slope, intercept, math.nan, math.nan
+        rvalue = max(-1.0, min(1.0, rvalue))
+
+    if n == 2:
+        pvalue = 1.0 if arr_y[0] == arr_y[1] else 0.0
+    else:
+        df = n - 2
+        tiny = 1.0e-20  # Same guard as SciPy against r == +/-1
+        t = rvalue * math.sqrt(df / ((1.0 - rvalue + tiny) * (1.0 + rvalue + tiny)))
+        pvalue = float(2.0 * stdtr(df, -abs(t)))
+    return slope, intercept, rvalue, pvalue
 
 
 # Tool function implementations (exported for testing)
@@ -35,30 +196,48 @@ def tool_describe_data(
             if len(data) < 1:
                 return "Error: Data array must contain at least one value"
             
-            arr = np.array(data, dtype=float)
-            
-            # Basic statistics
-            count = len(arr)
-            mean = float(np.mean(arr))
-            median = float(np.median(arr))
-            if count < 2:
-                std = 0.0
-                variance = 0.0
+            count = len(data)
+            ordered = None
+            if count < _PURE_PYTHON_MAX_SIZE:
+                values = [float(x) for x in data]
+                # NaN/inf take the NumPy path, which propagates them; sorted()
+                # cannot order NaN
+                if all(map(math.isfinite, values)):
+                    ordered = sorted(values)
+            if ordered is not None:
+                # Short inputs: sorting a few floats beats NumPy's per-call overhead
+                p25, p50, p75, p95, p99 = _sorted_percentiles(ordered)
+                mean = _pairwise_sum(values) / count
+                if count < 2:
+                    variance = 0.0
+                else:
+                    # d * d overflows to inf like NumPy, where ** 2 would raise
+                    variance = _pairwise_sum([(x - mean) * (x - mean) for x in values]) / (count - 1)
+                std = math.sqrt(variance)
+                min_val = ordered[0]
+                max_val = ordered[-1]
             else:
-                std = float(np.std(arr, ddof=1))  # Sample standard deviation
-                variance = float(np.var(arr, ddof=1))  # Sample variance
-            min_val = float(np.min(arr))
-            max_val = float(np.max(arr))
-            range_val = max_val - min_val
+                arr = np.asarray(data, dtype=np.float64)
+                
+                # Percentiles in one call so the data is partitioned once
+                p25, p50, p75, p95, p99 = _percentiles(arr)
+                if count < 2:
+                    # A single non-finite value lands here
+                    mean = min_val = max_val = float(arr[0])
+                    variance = 0.0
+                else:
+                    mean, variance, min_val, max_val = _moments(arr)
+                std = math.sqrt(variance)  # Sample standard deviation
             
-            # Percentiles
             percentiles = {
-                "p25": float(np.percentile(arr, 25)),
-                "p50": float(np.percentile(arr, 50)),  # Same as median
-                "p75": float(np.percentile(arr, 75)),
-                "p95": float(np.percentile(arr, 95)),
-                "p99": float(np.percentile(arr, 99)),
+                "p25": p25,
+                "p50": p50,
+                "p75": p75,
+                "p95": p95,
+                "p99": p99,
             }
+            median = p50  # The 50th percentile is the median
+            range_val = max_val - min_val
             
             result = {
                 "count": count,
@@ -72,7 +251,7 @@ def tool_describe_data(
                 "percentiles": percentiles,
             }
             
-            return json.dumps(result)
+            return dumps_json(result)
         except Exception as e:
             return f"Error: {str(e)}"
 
@@ -102,7 +281,7 @@ def tool_ttest(
             if not sample1:
                 return "Error: sample1 cannot be empty"
             
-            arr1 = np.array(sample1, dtype=float)
+            arr1 = np.asarray(sample1, dtype=np.float64)
             
             # Map alternative to scipy format
             alt_map = {
@@ -126,16 +305,26 @@ def tool_ttest(
                 if not sample2:
                     return "Error: sample2 cannot be empty"
                 
-                arr2 = np.array(sample2, dtype=float)
-                result = stats.ttest_ind(arr1, arr2, alternative=scipy_alternative)
-                statistic = float(result.statistic)
-                pvalue = float(result.pvalue)
+                arr2 = np.asarray(sample2, dtype=np.float64)
                 degrees_of_freedom = len(arr1) + len(arr2) - 2
+                if stats_kernels.HAS_NUMBA and len(arr1) + len(arr2) > stats_kernels.NUMBA_MIN_SIZE:
+                    # Fused compiled reductions; the t-distribution tail is a direct stdtr call
+                    statistic = float(stats_kernels.ttest_ind_statistic(arr1, arr2))
+                    if scipy_alternative == "two-sided":
+                        pvalue = float(2.0 * stdtr(degrees_of_freedom, -abs(statistic)))
+                    elif scipy_alternative == "greater":
+                        pvalue = float(stdtr(degrees_of_freedom, -statistic))
+                    else:
+                        pvalue = float(stdtr(degrees_of_freedom, statistic))
+                else:
+                    result = stats.ttest_ind(arr1, arr2, alternative=scipy_alternative)
+                    statistic = float(result.statistic)
+                    pvalue = float(result.pvalue)
             
             # Determine significance at α=0.05
             significant = pvalue < 0.05
             
-            return json.dumps({
+            return dumps_json({
                 "statistic": statistic,
                 "pvalue": pvalue,
                 "degrees_of_freedom": degrees_of_freedom,
@@ -173,12 +362,13 @@ def tool_correlation(
             if len(x_data) != len(y_data):
                 return f"Error: x_data and y_data must have the same length. Got {len(x_data)} and {len(y_data)}"
             
-            arr_x = np.array(x_data, dtype=float)
-            arr_y = np.array(y_data, dtype=float)
+            # Contiguous float64 (no copy if already so) so _pearsonr's dot products go to BLAS
+            arr_x = np.ascontiguousarray(x_data, dtype=np.float64)
+            arr_y = np.ascontiguousarray(y_data, dtype=np.float64)
             
-            # Map method to scipy function
+            # Map method to a function returning (correlation, pvalue)
             method_map = {
-                "pearson": lambda x, y: stats.pearsonr(x, y),
+                "pearson": _pearsonr,
                 "spearman": lambda x, y: stats.spearmanr(x, y),
                 "kendall": lambda x, y: stats.kendalltau(x, y),
             }
@@ -186,17 +376,11 @@ def tool_correlation(
             if method not in method_map:
                 return f"Error: method must be one of: {list(method_map.keys())}"
             
-            result = method_map[method](arr_x, arr_y)
-            
-            # Handle different return types
-            if method == "kendall":
-                correlation = float(result.correlation)
-                pvalue = float(result.pvalue)
-            else:
-                correlation = float(result.statistic)
-                pvalue = float(result.pvalue)
+            correlation, pvalue = method_map[method](arr_x, arr_y)
+            correlation = float(correlation)
+            pvalue = float(pvalue)
             
-            return json.dumps({
+            return dumps_json({
                 "correlation": correlation,
                 "pvalue": pvalue,
                 "method": method,
@@ -234,16 +418,12 @@ def tool_linear_regression(
             if len(x_data) < 2:
                 return "Error: Need at least 2 data points for regression"
             
-            arr_x = np.array(x_data, dtype=float)
-            arr_y = np.array(y_data, dtype=float)
+            arr_x = np.asarray(x_data, dtype=np.float64)
+            arr_y = np.asarray(y_data, dtype=np.float64)
             
             # Perform linear regression
-            result = linregress(arr_x, arr_y)
-            
-            slope = float(result.slope)
-            intercept = float(result.intercept)
-            r_squared = float(result.rvalue ** 2)
-            pvalue = float(result.pvalue)
+            slope, intercept, rvalue, pvalue = _linregress(arr_x, arr_y)
+            r_squared = rvalue ** 2
             
             # Format equation string
             if intercept >= 0:
@@ -251,7 +431,7 @@ def tool_linear_regression(
             else:
                 equation = f"y = {slope:.6f}*x - {abs(intercept):.6f}"
             
-            return json.dumps({
+            return dumps_json({
                 "slope": slope,
                 "intercept": intercept,
                 "r_squared": r_squared,
@@ -292,12 +472,12 @@ def tool_moving_average(
             if window > len(data):
                 return f"Error: window ({window}) cannot be larger than data length ({len(data)})"
             
-            arr = np.array(data, dtype=float)
+            arr = np.asarray(data, dtype=np.float64)
             
             if method == "simple":
-                # Simple moving average using convolution
-                weights = np.ones(window) / window
-                smoothed = np.convolve(arr, weights, mode='valid')
+                # Average each window independently; a running prefix sum would
+                # cancel catastrophically after a large value
+                smoothed = np.lib.stride_tricks.sliding_window_view(arr, window).mean(axis=1)
                 # Pad the beginning to match original length
                 # Use the first smoothed value for padding, or first data value if smoothed is empty
                 if len(smoothed) < len(arr):
@@ -311,16 +491,19 @@ def tool_moving_average(
                 # Exponentially weighted moving average
                 # Using pandas-like approach with alpha = 2/(window+1)
                 alpha = 2.0 / (window + 1.0)
-                smoothed = np.zeros_like(arr)
-                smoothed[0] = arr[0]
-                for i in range(1, len(arr)):
-                    smoothed[i] = alpha * arr[i] + (1 - alpha) * smoothed[i-1]
+                if stats_kernels.HAS_NUMBA and len(arr) >= stats_kernels.NUMBA_MIN_SIZE:
+                    smoothed = stats_kernels.ewma(arr, alpha)
+                else:
+                    smoothed = np.empty_like(arr)
+                    smoothed[0] = arr[0]
+                    for i in range(1, len(arr)):
+                        smoothed[i] = alpha * arr[i] + (1 - alpha) * smoothed[i-1]
             else:
                 return f"Error: method must be 'simple' or 'exponential', got '{method}'"
             
-            return json.dumps({
-                "smoothed": [float(x) for x in smoothed],
-                "original": [float(x) for x in arr],
+            return dumps_json({
+                "smoothed": smoothed,
+                "original": arr,
                 "window": window,
                 "method": method,
             })
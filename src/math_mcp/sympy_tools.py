@@ -1,5 +1,6 @@
 """SymPy-based symbolic math tools."""
 
+from functools import lru_cache
 from typing import Annotated
 
 from pydantic import Field
@@ -20,6 +21,19 @@ from sympy.core.sympify import SympifyError
 from math_mcp.utils import parse_expr
 
 
+# simplify() and integrate() are the slow calls here and their results are
+# plain strings, so repeated requests for the same input are answered from cache.
+# Parse errors propagate and are not cached.
+@lru_cache(maxsize=256)
+def _simplify_cached(expression: str) -> str:
+    return str(simplify(parse_expr(expression)))
+
+
+@lru_cache(maxsize=256)
+def _integrate_cached(expression: str, variable: str) -> str:
+    return str(integrate(parse_expr(expression), symbols(variable)))
+
+
 # Tool function implementations (exported for testing)
 def tool_simplify(
         expression: Annotated[str, Field(description="Mathematical expression to simplify. Supports polynomials, trigonometric identities, algebraic fractions, and more. Use ^ for exponentiation (e.g. 'x^2 + 2*x + 1' or 'sin(x)^2 + cos(x)^2').")]
@@ -40,9 +54,7 @@ def tool_simplify(
         - '(x^2 - 4)/(x - 2)' → 'x + 2' (rational simplification)
         """
         try:
-            expr = parse_expr(expression)
-            result = simplify(expr)
-            return str(result)
+            return _simplify_cached(expression)
         except SympifyError as e:
             return f"Error: Could not parse expression: {e}"
 
@@ -129,10 +141,7 @@ def tool_integral(
         - expression='1/x', variable='x' → 'log(x)' (logarithmic integral)
         """
         try:
-            expr = parse_expr(expression)
-            var = symbols(variable)
-            result = integrate(expr, var)
-            return str(result)
+            return _integrate_cached(expression, variable)
         except SympifyError as e:
             return f"Error: Could not parse expression: {e}"
 
@@ -1,12 +1,104 @@
-"""Unit conversion tools using SymPy units."""
+"""Unit conversion tools using a float scale-factor table."""
 
+from functools import lru_cache
 from typing import Annotated
 
 from pydantic import Field
-from sympy.physics import units
-from sympy.physics.units import convert_to
 
 
+# Linear units as (dimension, scale to the SI unit of that dimension); conversion
+# is value * from_scale / to_scale, and units only convert within a dimension
+_UNIT_MAP = {
+    # Length
+    'meter': ('length', 1.0),
+    'metre': ('length', 1.0),  # British spelling
+    'meters': ('length', 1.0),
+    'metres': ('length', 1.0),
+    'kilometer': ('length', 1000.0),
+    'kilometre': ('length', 1000.0),
+    'kilometers': ('length', 1000.0),
+    'kilometres': ('length', 1000.0),
+    'centimeter': ('length', 0.01),
+    'centimetre': ('length', 0.01),
+    'centimeters': ('length', 0.01),
+    'centimetres': ('length', 0.01),
+    'millimeter': ('length', 0.001),
+    'millimetre': ('length', 0.001),
+    'millimeters': ('length', 0.001),
+    'millimetres': ('length', 0.001),
+    'mile': ('length', 1609.344),
+    'miles': ('length', 1609.344),
+    'foot': ('length', 0.3048),
+    'feet': ('length', 0.3048),
+    'inch': ('length', 0.0254),
+    'inches': ('length', 0.0254),
+    'yard': ('length', 0.9144),
+    'yards': ('length', 0.9144),
+    # Mass
+    'kilogram': ('mass', 1.0),
+    'kilograms': ('mass', 1.0),
+    'gram': ('mass', 0.001),
+    'grams': ('mass', 0.001),
+    'pound': ('mass', 0.45359237),
+    'pounds': ('mass', 0.45359237),
+    # Time
+    'second': ('time', 1.0),
+    'seconds': ('time', 1.0),
+    'minute': ('time', 60.0),
+    'minutes': ('time', 60.0),
+    'hour': ('time', 3600.0),
+    'hours': ('time', 3600.0),
+    'day': ('time', 86400.0),
+    'days': ('time', 86400.0),
+    # Volume
+    'liter': ('volume', 0.001),
+    'litre': ('volume', 0.001),
+    'liters': ('volume', 0.001),
+    'litres': ('volume', 0.001),
+    'milliliter': ('volume', 1e-6),
+    'millilitre': ('volume', 1e-6),
+    'milliliters': ('volume', 1e-6),
+    'millilitres': ('volume', 1e-6),
+    'quart': ('volume', 0.000946352946),
+    'quarts': ('volume', 0.000946352946),
+    # Speed
+    'meter_per_second': ('speed', 1.0),
+    'metre_per_second': ('speed', 1.0),
+    'meters_per_second': ('speed', 1.0),
+    'metres_per_second': ('speed', 1.0),
+    'kilometer_per_hour': ('speed', 1000.0 / 3600.0),
+    'kilometre_per_hour': ('speed', 1000.0 / 3600.0),
+    'kilometers_per_hour': ('speed', 1000.0 / 3600.0),
+    'kilometres_per_hour': ('speed', 1000.0 / 3600.0),
+    'mile_per_hour': ('speed', 0.44704),
+    'miles_per_hour': ('speed', 0.44704),
+}
+
+
+# Canonical names for error messages (plural aliases of a listed unit are omitted)
+_AVAILABLE_UNITS = sorted(
+    k for k in _UNIT_MAP if not (k.endswith('s') and k[:-1] in _UNIT_MAP)
+)
+_AVAILABLE_UNITS_MSG = ', '.join(_AVAILABLE_UNITS)
+
+# Temperature units need an offset, not just a scale, so they are handled separately
+_TEMP_UNITS = frozenset({'celsius', 'fahrenheit', 'kelvin'})
+
+
+@lru_cache(maxsize=256)
+def _get_scale(from_lower: str, to_lower: str) -> float:
+    """Factor converting between two linear units.
+
+    Raises KeyError for an unknown unit and ValueError across dimensions.
+    """
+    from_dimension, from_scale = _UNIT_MAP[from_lower]
+    to_dimension, to_scale = _UNIT_MAP[to_lower]
+    if from_dimension != to_dimension:
+        raise ValueError(
+            f"Cannot convert {from_dimension} unit '{from_lower}' to {to_dimension} unit '{to_lower}'"
+        )
+    return from_scale / to_scale
+
 
 # Tool function implementation (exported for testing)
 def tool_convert_unit(
@@ -38,8 +130,7 @@ def tool_convert_unit(
             to_lower = to_unit.lower()
             
             # Handle temperature conversions manually (they require offset, not just scaling)
-            temp_units = {'celsius', 'fahrenheit', 'kelvin'}
-            if from_lower in temp_units or to_lower in temp_units:
+            if from_lower in _TEMP_UNITS or to_lower in _TEMP_UNITS:
                 # Convert to Kelvin first, then to target
                 if from_lower == 'celsius':
                     kelvin = value + 273.15
@@ -65,93 +156,15 @@ def tool_convert_unit(
                     return str(int(round(result)))
                 return str(round(result, 10))
             
-            # Unit mapping for common units (only those available in SymPy)
-            unit_map = {
-                # Length
-                'meter': units.meter,
-                'metre': units.meter,  # British spelling
-                'meters': units.meter,
-                'metres': units.meter,
-                'kilometer': units.kilometer,
-                'kilometre': units.kilometer,
-                'kilometers': units.kilometer,
-                'kilometres': units.kilometer,
-                'centimeter': units.centimeter,
-                'centimetre': units.centimeter,
-                'centimeters': units.centimeter,
-                'centimetres': units.centimeter,
-                'millimeter': units.millimeter,
-                'millimetre': units.millimeter,
-                'millimeters': units.millimeter,
-                'millimetres': units.millimeter,
-                'mile': units.mile,
-                'miles': units.mile,
-                'foot': units.foot,
-                'feet': units.foot,
-                'inch': units.inch,
-                'inches': units.inch,
-                'yard': units.yard,
-                'yards': units.yard,
-                # Mass
-                'kilogram': units.kilogram,
-                'kilograms': units.kilogram,
-                'gram': units.gram,
-                'grams': units.gram,
-                'pound': units.pound,
-                'pounds': units.pound,
-                # Time
-                'second': units.second,
-                'seconds': units.second,
-                'minute': units.minute,
-                'minutes': units.minute,
-                'hour': units.hour,
-                'hours': units.hour,
-                'day': units.day,
-                'days': units.day,
-                # Volume
-                'liter': units.liter,
-                'litre': units.liter,
-                'liters': units.liter,
-                'litres': units.liter,
-                'milliliter': units.milliliter,
-                'millilitre': units.milliliter,
-                'milliliters': units.milliliter,
-                'millilitres': units.milliliter,
-                'quart': units.quart,
-                'quarts': units.quart,
-                # Speed
-                'meter_per_second': units.meter / units.second,
-                'metre_per_second': units.meter / units.second,
-                'meters_per_second': units.meter / units.second,
-                'metres_per_second': units.meter / units.second,
-                'kilometer_per_hour': units.kilometer / units.hour,
-                'kilometre_per_hour': units.kilometer / units.hour,
-                'kilometers_per_hour': units.kilometer / units.hour,
-                'kilometres_per_hour': units.kilometer / units.hour,
-                'mile_per_hour': units.mile / units.hour,
-                'miles_per_hour': units.mile / units.hour,
-            }
-            
-            from_unit_obj = unit_map.get(from_lower)
-            to_unit_obj = unit_map.get(to_lower)
-            
-            if from_unit_obj is None:
-                available = sorted(set(k for k in unit_map.keys() if not (k.endswith('s') and k[:-1] in unit_map)))
-                return f"Error: Unknown source unit '{from_unit}'. Supported units: {', '.join(available)}"
-            
-            if to_unit_obj is None:
-                available = sorted(set(k for k in unit_map.keys() if not (k.endswith('s') and k[:-1] in unit_map)))
-                return f"Error: Unknown target unit '{to_unit}'. Supported units: {', '.join(available)}"
-            
-            # Create quantity with source unit
-            quantity = value * from_unit_obj
-            
-            # Convert to target unit
-            result = convert_to(quantity, to_unit_obj)
-            
-            # Extract numeric value by dividing by target unit (removes unit, leaves number)
-            # Result is a Mul like (0.1 * kilometer), so divide by the unit to get just the number
-            numeric_result = float((result / to_unit_obj).evalf())
+            # Unknown names surface as the KeyError from _get_scale's table lookups
+            try:
+                numeric_result = value * _get_scale(from_lower, to_lower)
+            except KeyError:
+                if from_lower not in _UNIT_MAP:
+                    return f"Error: Unknown source unit '{from_unit}'. Supported units: {_AVAILABLE_UNITS_MSG}"
+                return f"Error: Unknown target unit '{to_unit}'. Supported units: {_AVAILABLE_UNITS_MSG}"
+            except ValueError as e:
+                return f"Error: {e}"
             
             # Return as string, with reasonable precision
             if abs(numeric_result - round(numeric_result)) < 1e-10:
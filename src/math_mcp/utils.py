@@ -1,10 +1,37 @@
 """Shared utilities for math MCP tools."""
 
+import json
+from functools import lru_cache
+
+import numpy as np
 from sympy import E, I, pi, sympify
 
 
+@lru_cache(maxsize=512)
+def _sympify_cached(expr_str: str):
+    """Sympify a normalized expression string; SymPy expressions are immutable, so results are shared."""
+    return sympify(expr_str, locals={"pi": pi, "E": E, "I": I})
+
+
 def parse_expr(expression: str):
     """Parse expression with common substitutions."""
     # Replace ^ with ** for exponentiation
     expr_str = expression.replace("^", "**")
-    return sympify(expr_str, locals={"pi": pi, "E": E, "I": I})
+    return _sympify_cached(expr_str)
+
+
+def _ndarray_default(obj):
+    """json.dumps fallback hook serializing NumPy arrays as lists."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_json(obj) -> str:
+    """Serialize a tool result to a JSON string.
+
+    NumPy arrays may be passed as values directly. Non-finite floats are written
+    as the NaN/Infinity literals, as json.dumps always has; orjson is not used
+    here because it turns them into null.
+    """
+    return json.dumps(obj, default=_ndarray_default)
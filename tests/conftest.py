@@ -0,0 +1,36 @@
+"""Shared pytest fixtures."""
+
+import io
+import os
+
+import pytest
+
+# Pick Agg before anything imports pyplot, including in each pytest-xdist worker
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _warm_matplotlib():
+    """Select Agg and render one figure so backend and font-cache setup happen once per session."""
+    import matplotlib
+
+    matplotlib.use("Agg")
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(1, 1))
+    ax = fig.subplots()
+    ax.set_title("warm-up")
+    fig.savefig(io.BytesIO(), format="png")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _warm_sympy():
+    """Run each SymPy entry point the tools use once, so lazy imports and caches are built up front."""
+    import sympy
+
+    x = sympy.Symbol("x")
+    sympy.sympify("x + 1")
+    sympy.simplify(x + x)
+    sympy.solve(x - 1, x)
+    sympy.integrate(x, x)
+    sympy.diff(sympy.sin(x), x)
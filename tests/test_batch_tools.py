@@ -2,14 +2,10 @@
 
 import asyncio
 import json
-import sys
-from pathlib import Path
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import mcp.types as types
 
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-
 from math_mcp.batch_tools import (
     MAX_BATCH_SIZE,
     CallSpec,
@@ -1,12 +1,7 @@
 """Tests for HTTP/streamable-http transport."""
 
-import sys
-from pathlib import Path
-
 import pytest
 
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-
 from math_mcp.server import _wrap_http_app, mcp
 
 
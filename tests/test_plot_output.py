@@ -3,15 +3,41 @@
 from __future__ import annotations
 
 import base64
-import sys
-from pathlib import Path
+from uuid import uuid4
 
+import pytest
 from mcp.types import ImageContent
 
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-
 from math_mcp import plot_output
 
+_PAYLOAD = b"plot-bytes"
+_PAYLOAD_B64 = base64.b64encode(_PAYLOAD).decode("ascii")
+
+
+@pytest.fixture(scope="session")
+def charts_root(tmp_path_factory):
+    return tmp_path_factory.mktemp("charts_root")
+
+
+@pytest.fixture
+def output_dir(charts_root):
+    """Fresh directory per test, under the shared session root."""
+    path = charts_root / uuid4().hex
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def patched_plot_output(output_dir, monkeypatch):
+    """Point MCP_OUTPUT_DIR at output_dir and pin the output timestamp."""
+    monkeypatch.setenv("MCP_OUTPUT_DIR", str(output_dir))
+    monkeypatch.setattr(
+        plot_output,
+        "_utc_date_and_timestamp",
+        lambda: ("2026-01-15", "20260115143025"),
+    )
+    return output_dir
+
 
 class DummyURL:
     def __init__(self, scheme: str, hostname: str, port: int | None = None):
@@ -67,8 +93,8 @@ def test_sanitize_session_id_generates_when_empty():
     assert generated.startswith("session-")
 
 
-def test_build_unique_path_adds_counter_when_needed(tmp_path):
-    target_dir = tmp_path / "charts"
+def test_build_unique_path_adds_counter_when_needed(output_dir):
+    target_dir = output_dir / "charts"
     target_dir.mkdir()
     existing = target_dir / "chart-20260101010101.png"
     existing.write_text("existing")
@@ -77,18 +103,10 @@ def test_build_unique_path_adds_counter_when_needed(tmp_path):
     assert path.name == "chart-20260101010101-1.png"
 
 
-def test_maybe_save_plot_output_writes_file_and_returns_url(tmp_path, monkeypatch):
-    monkeypatch.setenv("MCP_OUTPUT_DIR", str(tmp_path))
-    monkeypatch.setattr(
-        plot_output,
-        "_utc_date_and_timestamp",
-        lambda: ("2026-01-15", "20260115143025"),
-    )
-
-    payload = b"plot-bytes"
+def test_maybe_save_plot_output_writes_file_and_returns_url(patched_plot_output):
     image = ImageContent(
         type="image",
-        data=base64.b64encode(payload).decode("utf-8"),
+        data=_PAYLOAD_B64,
         mimeType="image/png",
     )
     headers = {
@@ -105,19 +123,19 @@ def test_maybe_save_plot_output_writes_file_and_returns_url(tmp_path, monkeypatc
     )
 
     saved_path = (
-        tmp_path
+        patched_plot_output
         / "charts"
         / "2026-01-15"
         / "abc123"
         / "chart-20260115143025.png"
     )
-    assert saved_path.read_bytes() == payload
+    assert saved_path.read_bytes() == _PAYLOAD
 
 
 def test_maybe_save_plot_output_returns_none_without_base_url():
     image = ImageContent(
         type="image",
-        data=base64.b64encode(b"plot-bytes").decode("utf-8"),
+        data=_PAYLOAD_B64,
         mimeType="image/png",
     )
     assert plot_output.maybe_save_plot_output([image], None) is None
@@ -1,13 +1,11 @@
 """Tests for math_mcp tools."""
 
 import json
-import sys
-from pathlib import Path
 
+import pytest
 
-# Add src to path for imports (needed for src-layout packages)
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-
+from math_mcp import plotting_tools
+from math_mcp.plotting_tools import tool_plot_ode_solution
 from math_mcp.scipy_tools import tool_find_root, tool_solve_ode
 from math_mcp.sympy_tools import (
     tool_derivative,
@@ -22,65 +20,117 @@ from math_mcp.sympy_tools import (
     tool_to_fraction,
 )
 from math_mcp.unit_tools import tool_convert_unit
+from math_mcp.utils import dumps_json, parse_expr
 
 
-class TestSimplify:
-    def test_basic(self):
-        assert tool_simplify("x + x") == "2*x"
+class TestParseExpr:
+    def test_caret_is_exponent(self):
+        assert str(parse_expr("x^2 + 1")) == "x**2 + 1"
 
-    def test_trig_identity(self):
-        assert tool_simplify("sin(x)**2 + cos(x)**2") == "1"
+    def test_repeat_parse_is_cached(self):
+        assert parse_expr("y^3 - y") is parse_expr("y**3 - y")
 
-    def test_simplify_fraction(self):
-        assert tool_simplify("(x**2 - 1)/(x - 1)") == "x + 1"
 
+class TestDumpsJson:
+    def test_serializes_numpy_arrays(self):
+        import numpy as np
 
-class TestSolve:
-    def test_linear(self):
-        assert tool_solve("x - 5", "x") == ["5"]
+        result = dumps_json({"values": np.array([1.0, 2.5]), "label": "x"})
+        assert result == '{"values": [1.0, 2.5], "label": "x"}'
 
-    def test_quadratic(self):
-        result = tool_solve("x**2 - 4", "x")
-        assert set(result) == {"-2", "2"}
+    def test_non_finite_values_use_json_literals(self):
+        import numpy as np
 
-    def test_no_real_solution(self):
-        result = tool_solve("x**2 + 1", "x")
-        assert set(result) == {"-I", "I"}
+        payload = {"values": np.array([np.nan, np.inf]), "r": float("nan")}
+        assert dumps_json(payload) == '{"values": [NaN, Infinity], "r": NaN}'
 
 
-class TestDerivative:
-    def test_polynomial(self):
-        assert tool_derivative("x**3", "x") == "3*x**2"
+class TestSimplify:
+    @pytest.mark.parametrize(
+        ("expression", "expected"),
+        [
+            pytest.param("x + x", "2*x", id="basic"),
+            pytest.param("sin(x)**2 + cos(x)**2", "1", id="trig_identity"),
+            pytest.param("(x**2 - 1)/(x - 1)", "x + 1", id="simplify_fraction"),
+        ],
+    )
+    def test_simplify(self, expression, expected):
+        assert tool_simplify(expression) == expected
+
+    def test_repeat_input_is_cached(self):
+        from math_mcp.sympy_tools import _simplify_cached
+
+        _simplify_cached.cache_clear()
+        assert tool_simplify("2*x + x") == tool_simplify("2*x + x") == "3*x"
+        info = _simplify_cached.cache_info()
+        assert (info.hits, info.misses) == (1, 1)
 
-    def test_trig(self):
-        assert tool_derivative("sin(x)", "x") == "cos(x)"
 
-    def test_chain_rule(self):
-        assert tool_derivative("sin(x**2)", "x") == "2*x*cos(x**2)"
+class TestSolve:
+    @pytest.mark.parametrize(
+        ("equation", "expected"),
+        [
+            pytest.param("x - 5", ["5"], id="linear"),
+            pytest.param("x**2 - 4", ["-2", "2"], id="quadratic"),
+            pytest.param("x**2 + 1", ["-I", "I"], id="no_real_solution"),
+        ],
+    )
+    def test_solve(self, equation, expected):
+        # Roots come back in no guaranteed order
+        assert sorted(tool_solve(equation, "x")) == expected
+
+
+class TestDerivative:
+    @pytest.mark.parametrize(
+        ("expression", "expected"),
+        [
+            pytest.param("x**3", "3*x**2", id="polynomial"),
+            pytest.param("sin(x)", "cos(x)", id="trig"),
+            pytest.param("sin(x**2)", "2*x*cos(x**2)", id="chain_rule"),
+        ],
+    )
+    def test_derivative(self, expression, expected):
+        assert tool_derivative(expression, "x") == expected
 
 
 class TestIntegral:
-    def test_polynomial(self):
-        assert tool_integral("x**2", "x") == "x**3/3"
+    @pytest.mark.parametrize(
+        ("expression", "expected"),
+        [
+            pytest.param("x**2", "x**3/3", id="polynomial"),
+            pytest.param("cos(x)", "sin(x)", id="trig"),
+        ],
+    )
+    def test_integral(self, expression, expected):
+        assert tool_integral(expression, "x") == expected
 
-    def test_trig(self):
-        assert tool_integral("cos(x)", "x") == "sin(x)"
+    def test_cache_is_keyed_by_variable(self):
+        assert tool_integral("x*y", "x") == "x**2*y/2"
+        assert tool_integral("x*y", "y") == "x*y**2/2"
 
 
 class TestExpand:
-    def test_square(self):
-        assert tool_expand("(x + 1)**2") == "x**2 + 2*x + 1"
-
-    def test_difference_of_squares(self):
-        assert tool_expand("(a + b)*(a - b)") == "a**2 - b**2"
+    @pytest.mark.parametrize(
+        ("expression", "expected"),
+        [
+            pytest.param("(x + 1)**2", "x**2 + 2*x + 1", id="square"),
+            pytest.param("(a + b)*(a - b)", "a**2 - b**2", id="difference_of_squares"),
+        ],
+    )
+    def test_expand(self, expression, expected):
+        assert tool_expand(expression) == expected
 
 
 class TestFactor:
-    def test_difference_of_squares(self):
-        assert tool_factor("x**2 - 4") == "(x - 2)*(x + 2)"
-
-    def test_perfect_square(self):
-        assert tool_factor("x**2 + 2*x + 1") == "(x + 1)**2"
+    @pytest.mark.parametrize(
+        ("expression", "expected"),
+        [
+            pytest.param("x**2 - 4", "(x - 2)*(x + 2)", id="difference_of_squares"),
+            pytest.param("x**2 + 2*x + 1", "(x + 1)**2", id="perfect_square"),
+        ],
+    )
+    def test_factor(self, expression, expected):
+        assert tool_factor(expression) == expected
 
 
 class TestEvaluate:
@@ -98,25 +148,29 @@ class TestEvaluate:
 
 
 class TestLatex:
-    def test_fraction(self):
-        assert tool_latex("1/2") == r"\frac{1}{2}"
-
-    def test_sqrt(self):
-        assert tool_latex("sqrt(x)") == r"\sqrt{x}"
-
-    def test_power(self):
-        assert tool_latex("x**2") == "x^{2}"
+    @pytest.mark.parametrize(
+        ("expression", "expected"),
+        [
+            pytest.param("1/2", r"\frac{1}{2}", id="fraction"),
+            pytest.param("sqrt(x)", r"\sqrt{x}", id="sqrt"),
+            pytest.param("x**2", "x^{2}", id="power"),
+        ],
+    )
+    def test_latex(self, expression, expected):
+        assert tool_latex(expression) == expected
 
 
 class TestToFraction:
-    def test_simple_decimal(self):
-        assert tool_to_fraction("0.5") == "1/2"
-
-    def test_decimal_three_fourths(self):
-        assert tool_to_fraction("0.75") == "3/4"
-
-    def test_mixed_number(self):
-        assert tool_to_fraction("1.25") == "5/4"
+    @pytest.mark.parametrize(
+        ("decimal", "expected"),
+        [
+            pytest.param("0.5", "1/2", id="simple_decimal"),
+            pytest.param("0.75", "3/4", id="decimal_three_fourths"),
+            pytest.param("1.25", "5/4", id="mixed_number"),
+        ],
+    )
+    def test_exact_decimal(self, decimal, expected):
+        assert tool_to_fraction(decimal) == expected
 
     def test_approximate_decimal(self):
         # Should convert to fraction representation
@@ -125,54 +179,88 @@ class TestToFraction:
 
 
 class TestSimplifyFraction:
-    def test_numeric_fraction(self):
-        assert tool_simplify_fraction("6/8") == "3/4"
+    @pytest.mark.parametrize(
+        ("fraction", "expected"),
+        [
+            pytest.param("6/8", "3/4", id="numeric_fraction"),
+            pytest.param("12/18", "2/3", id="another_numeric"),
+            pytest.param("(x**2 - 4)/(x - 2)", "x + 2", id="algebraic_fraction"),
+            pytest.param("(2*x + 4)/(x + 2)", "2", id="algebraic_with_factor"),
+        ],
+    )
+    def test_simplify_fraction(self, fraction, expected):
+        assert tool_simplify_fraction(fraction) == expected
 
-    def test_another_numeric(self):
-        assert tool_simplify_fraction("12/18") == "2/3"
 
-    def test_algebraic_fraction(self):
-        assert tool_simplify_fraction("(x**2 - 4)/(x - 2)") == "x + 2"
+class TestConvertUnit:
+    # rel=0 so only the absolute tolerance applies; 0.0 means an exact match
+    @pytest.mark.parametrize(
+        ("value", "from_unit", "to_unit", "expected", "tol"),
+        [
+            pytest.param(100.0, "meter", "kilometer", 0.1, 1e-10, id="length_meter_to_kilometer"),
+            pytest.param(5.0, "kilometer", "mile", 3.106855, 0.01, id="length_kilometer_to_mile"),
+            pytest.param(32.0, "fahrenheit", "celsius", 0.0, 1e-10, id="temperature_fahrenheit_to_celsius"),
+            pytest.param(1.0, "hour", "minute", 60.0, 0.0, id="time_hour_to_minute"),
+            pytest.param(1.0, "kilogram", "pound", 2.20462, 0.01, id="mass_kilogram_to_pound"),
+            pytest.param(
+                60.0, "mile_per_hour", "kilometer_per_hour", 96.56064, 1e-9,
+                id="speed_mile_per_hour_to_kilometer_per_hour",
+            ),
+        ],
+    )
+    def test_conversion(self, value, from_unit, to_unit, expected, tol):
+        result = float(tool_convert_unit(value, from_unit, to_unit))
+        assert result == pytest.approx(expected, rel=0, abs=tol)
 
-    def test_algebraic_with_factor(self):
-        assert tool_simplify_fraction("(2*x + 4)/(x + 2)") == "2"
+    def test_invalid_unit(self):
+        result = tool_convert_unit(1.0, "invalid_unit", "meter")
+        assert "Error" in result
 
+    def test_invalid_target_unit(self):
+        result = tool_convert_unit(1.0, "meter", "invalid_unit")
+        assert "Unknown target unit 'invalid_unit'" in result
 
-class TestConvertUnit:
-    def test_length_meter_to_kilometer(self):
-        result = float(tool_convert_unit(100.0, "meter", "kilometer"))
-        assert abs(result - 0.1) < 1e-10
+    def test_scale_is_cached_per_unit_pair(self):
+        from math_mcp.unit_tools import _get_scale
 
-    def test_length_kilometer_to_mile(self):
-        result = float(tool_convert_unit(5.0, "kilometer", "mile"))
-        assert abs(result - 3.106855) < 0.01  # Approximately 3.1 miles
+        _get_scale.cache_clear()
+        tool_convert_unit(1.0, "Mile", "kilometer")
+        tool_convert_unit(2.0, "mile", "KILOMETER")
+        info = _get_scale.cache_info()
+        assert (info.hits, info.misses) == (1, 1)
 
-    def test_temperature_fahrenheit_to_celsius(self):
-        result = float(tool_convert_unit(32.0, "fahrenheit", "celsius"))
-        assert abs(result - 0.0) < 1e-10  # Freezing point
+    def test_incompatible_dimensions(self):
+        result = tool_convert_unit(1.0, "meter", "kilogram")
+        assert "Error" in result
+        assert "length" in result and "mass" in result
 
-    def test_time_hour_to_minute(self):
-        result = float(tool_convert_unit(1.0, "hour", "minute"))
-        assert result == 60.0
 
-    def test_mass_kilogram_to_pound(self):
-        result = float(tool_convert_unit(1.0, "kilogram", "pound"))
-        assert abs(result - 2.20462) < 0.01  # Approximately 2.2 lbs
+@pytest.fixture(scope="module")
+def decay_ode_result():
+    """rk45 solution of dx/dt = -x, solved once and shared (the result is deterministic)."""
+    return json.loads(tool_solve_ode(
+        equations=["dx/dt = -x"],
+        initial_conditions={"x": 1.0},
+        time_span=[0.0, 5.0],
+        method="rk45",
+    ))
 
-    def test_invalid_unit(self):
-        result = tool_convert_unit(1.0, "invalid_unit", "meter")
-        assert "Error" in result
+
+@pytest.fixture(scope="module")
+def coupled_ode_result():
+    """rk45 solution of the coupled x/y exchange system, solved once and shared."""
+    return json.loads(tool_solve_ode(
+        equations=["dx/dt = -x + y", "dy/dt = x - y"],
+        initial_conditions={"x": 1.0, "y": 0.0},
+        time_span=[0.0, 10.0],
+        method="rk45",
+    ))
 
 
+@pytest.mark.xdist_group("ode_results")
 class TestSolveOde:
-    def test_simple_exponential_decay(self):
-        result = tool_solve_ode(
-            equations=["dx/dt = -x"],
-            initial_conditions={"x": 1.0},
-            time_span=[0.0, 5.0],
-            method="rk45",
-        )
-        data = json.loads(result)
+    def test_simple_exponential_decay(self, decay_ode_result):
+        data = decay_ode_result
         assert data["success"] is True
         assert "time" in data
         assert "state" in data
@@ -180,19 +268,18 @@ class TestSolveOde:
         # Check that x decreases (exponential decay)
         assert data["state"]["x"][-1] < data["state"]["x"][0]
 
-    def test_coupled_system(self):
-        result = tool_solve_ode(
-            equations=["dx/dt = -x + y", "dy/dt = x - y"],
-            initial_conditions={"x": 1.0, "y": 0.0},
-            time_span=[0.0, 10.0],
-            method="rk45",
-        )
-        data = json.loads(result)
+    def test_coupled_system(self, coupled_ode_result):
+        data = coupled_ode_result
         assert data["success"] is True
         assert "x" in data["state"]
         assert "y" in data["state"]
         assert len(data["state"]["x"]) == len(data["state"]["y"])
 
+    def test_coupled_system_conserves_total(self, coupled_ode_result):
+        # d(x + y)/dt = 0, so x + y stays at its initial value of 1
+        state = coupled_ode_result["state"]
+        assert all(abs(x + y - 1.0) < 1e-6 for x, y in zip(state["x"], state["y"]))
+
     def test_euler_method(self):
         result = tool_solve_ode(
             equations=["dx/dt = -0.5*x"],
@@ -214,6 +301,44 @@ class TestSolveOde:
         assert "Missing initial conditions" in result
 
 
+class TestPlotOdeSolution:
+    def test_plots_solve_ode_output(self):
+        result = tool_solve_ode(
+            equations=["dx/dt = -x + y", "dy/dt = x - y"],
+            initial_conditions={"x": 1.0, "y": 0.0},
+            time_span=[0.0, 1.0],
+            method="euler",
+        )
+        image = tool_plot_ode_solution(result, secondary_y={"y": "y"})
+        assert image.mimeType == "image/png"
+        assert image.data
+
+    def test_plots_flat_t_layout(self):
+        image = tool_plot_ode_solution('{"t": [0, 1, 2], "x": [1, 0.5, 0.25], "success": true}')
+        assert image.mimeType == "image/png"
+
+    def test_missing_time_array(self):
+        with pytest.raises(ValueError, match="must contain 't'"):
+            tool_plot_ode_solution('{"state": {"x": [1, 0.5]}}')
+
+    def test_renders_through_render_seam(self, monkeypatch):
+        calls = []
+        monkeypatch.setattr(
+            plotting_tools, "_render",
+            lambda fig, output_format: calls.append((fig, output_format)) or "rendered",
+        )
+        ode_result = '{"t": [0, 1, 2], "x": [1, 0.5, 0.25], "y": [0, 0.5, 0.75]}'
+        assert tool_plot_ode_solution(ode_result, output_format="svg") == "rendered"
+        (fig, output_format), = calls
+        assert output_format == "svg"
+        assert [line.get_label() for line in fig.axes[0].get_lines()] == ["x", "y"]
+
+    def test_invalid_arguments_skip_render(self, monkeypatch):
+        monkeypatch.setattr(plotting_tools, "_render", lambda fig, output_format: pytest.fail("rendered"))
+        with pytest.raises(ValueError, match="output_format"):
+            tool_plot_ode_solution('{"t": [0, 1], "x": [1, 0.5]}', output_format="jpg")
+
+
 class TestFindRoot:
     def test_quadratic_with_bracket(self):
         result = tool_find_root(
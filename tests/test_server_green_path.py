@@ -1,13 +1,14 @@
 """Tests for server.py green path (happy path scenarios)."""
 
+import asyncio
+import base64
 import os
-import sys
-from pathlib import Path
+import struct
+import time
 from unittest.mock import MagicMock, patch
 
 import pytest
-
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+from mcp import types
 
 from math_mcp import server
 from math_mcp.server import (
@@ -17,6 +18,9 @@ from math_mcp.server import (
     transport_security,
 )
 
+# Evaluated once at import rather than in each skipif
+_HAS_HTTP = hasattr(mcp, "streamable_http_app")
+
 
 class TestServerInitialization:
     """Test server initialization and configuration."""
@@ -41,18 +45,21 @@ class TestServerInitialization:
         assert hasattr(mcp._mcp_server, "request_handlers")
 
 
+@pytest.fixture(scope="module")
+def http_app():
+    """Streamable HTTP app built once; the wrap tests only read its routes and lifespan."""
+    return mcp.streamable_http_app()
+
+
+@pytest.mark.xdist_group("http_app")
 class TestWrapHttpApp:
     """Test _wrap_http_app function."""
 
-    @pytest.mark.skipif(
-        not hasattr(mcp, "streamable_http_app"),
-        reason="mcp.streamable_http_app not available",
-    )
-    def test_wrap_http_app_with_lifespan(self):
+    @pytest.mark.skipif(not _HAS_HTTP, reason="mcp.streamable_http_app not available")
+    def test_wrap_http_app_with_lifespan(self, http_app):
         """Test wrapping HTTP app with lifespan."""
-        mcp_app = mcp.streamable_http_app()
-        lifespan = getattr(mcp_app, "lifespan", None)
-        wrapped = _wrap_http_app(mcp_app, lifespan=lifespan)
+        lifespan = getattr(http_app, "lifespan", None)
+        wrapped = _wrap_http_app(http_app, lifespan=lifespan)
         
         assert wrapped is not None
         assert hasattr(wrapped, "routes")
@@ -60,53 +67,204 @@ class TestWrapHttpApp:
         paths = [r.path for r in wrapped.routes if hasattr(r, "path")]
         assert "/outputs" in paths or any("/outputs" in str(r) for r in wrapped.routes)
 
-    @pytest.mark.skipif(
-        not hasattr(mcp, "streamable_http_app"),
-        reason="mcp.streamable_http_app not available",
-    )
-    def test_wrap_http_app_without_lifespan(self):
+    @pytest.mark.skipif(not _HAS_HTTP, reason="mcp.streamable_http_app not available")
+    def test_wrap_http_app_without_lifespan(self, http_app):
         """Test wrapping HTTP app without lifespan."""
-        mcp_app = mcp.streamable_http_app()
-        wrapped = _wrap_http_app(mcp_app)
+        wrapped = _wrap_http_app(http_app)
         
         assert wrapped is not None
         assert hasattr(wrapped, "routes")
 
-    def test_wrap_http_app_uses_output_dir_from_env(self):
-        """Test that _wrap_http_app uses MCP_OUTPUT_DIR from environment."""
-        from math_mcp import plot_output
-        
+    def test_wrap_http_app_uses_output_dir_from_env(self, monkeypatch):
+        """Test that _wrap_http_app serves /outputs from MCP_OUTPUT_DIR, read at call time."""
         test_output_dir = "/test/outputs"
-        with patch.dict(os.environ, {"MCP_OUTPUT_DIR": test_output_dir}):
-            # Reload the module to pick up the new env var
-            import importlib
-            import math_mcp.server
-            importlib.reload(math_mcp.server)
-            
-            # This is tricky because the function reads env at call time
-            # We'll just verify it reads from os.getenv
-            assert os.getenv("MCP_OUTPUT_DIR", plot_output.DEFAULT_OUTPUT_DIR) == test_output_dir
+        monkeypatch.setenv("MCP_OUTPUT_DIR", test_output_dir)
+        wrapped = _wrap_http_app(MagicMock())
+
+        outputs = next(r for r in wrapped.routes if getattr(r, "path", None) == "/outputs")
+        assert outputs.app.directory == test_output_dir
+
+
+class TestPlotUrlEndpoint:
+    """Test the /plot-urls endpoint."""
+
+    def _get(self, session_id):
+        from starlette.applications import Starlette
+        from starlette.routing import Route
+        from starlette.testclient import TestClient
+
+        app = Starlette(routes=[Route("/plot-urls", server._create_plot_url_endpoint())])
+        return TestClient(app).get("/plot-urls", params={"session_id": session_id})
+
+    def test_requires_session_id(self):
+        """Test that a missing session id is rejected."""
+        assert self._get("").status_code == 400
+
+    def test_returns_null_for_unknown_session(self):
+        """Test that an unknown session returns a null URL."""
+        resp = self._get("unknown-session")
+        assert resp.status_code == 200
+        assert resp.json() == {"url": None}
+
+    def test_returns_stored_url_until_expiry(self):
+        """Test that stored URLs are returned until their deadline passes."""
+        with patch.dict(server._plot_urls, {
+            "live": ("http://localhost/outputs/a.png", time.monotonic() + 60),
+            "stale": ("http://localhost/outputs/b.png", time.monotonic() - 1),
+        }):
+            assert self._get("live").json() == {"url": "http://localhost/outputs/a.png"}
+            assert self._get("stale").json() == {"url": None}
+
+    def test_returns_stored_url_without_orjson(self):
+        """Test that the stdlib JSON encoder is used when orjson is missing."""
+        with patch.object(server, "orjson", None), patch.dict(server._plot_urls, {
+            "live": ("http://localhost/outputs/a.png", time.monotonic() + 60),
+        }):
+            assert self._get("live").json() == {"url": "http://localhost/outputs/a.png"}
+
+    def test_purge_removes_only_expired_entries(self):
+        """Test that the cleanup sweep drops expired sessions only."""
+        with patch.dict(server._plot_urls, {
+            "live": ("http://localhost/outputs/a.png", 200.0),
+            "stale": ("http://localhost/outputs/b.png", 50.0),
+        }):
+            server._purge_expired_plot_urls(100.0)
+            assert "live" in server._plot_urls
+            assert "stale" not in server._plot_urls
+
+    def test_cleanup_lifespan_wraps_inner_lifespan(self):
+        """Test that the cleanup task runs alongside the wrapped lifespan."""
+        from contextlib import asynccontextmanager
+
+        from starlette.applications import Starlette
+        from starlette.testclient import TestClient
+
+        events = []
+
+        @asynccontextmanager
+        async def inner(app):
+            events.append("startup")
+            yield
+            events.append("shutdown")
+
+        app = Starlette(lifespan=server._with_plot_url_cleanup(inner))
+        with TestClient(app):
+            assert events == ["startup"]
+        assert events == ["startup", "shutdown"]
+
+
+@pytest.fixture
+def plot_url_app():
+    """FastMCP app with plotting tools and the plot URL handler attached.
+
+    main() only attaches the handler to the module-level server for HTTP transports.
+    """
+    from mcp.server.fastmcp import FastMCP
+
+    from math_mcp import plotting_tools
+
+    app = FastMCP("Math")
+    plotting_tools.register_plotting_tools(app)
+    server._attach_plot_url_handler(app)
+    return app
 
 
 class TestAttachPlotUrlHandler:
     """Test _attach_plot_url_handler function."""
 
-    def test_handler_attached(self):
-        """Test that handler is attached to CallToolRequest."""
-        # Verify handler is registered
-        from mcp import types
-        
-        assert types.CallToolRequest in mcp._mcp_server.request_handlers
+    def test_handler_not_attached_for_stdio(self, monkeypatch):
+        """Test that main() leaves FastMCP's CallTool handler alone under stdio."""
+        from mcp.server.fastmcp import FastMCP
 
-    def test_handler_registered_for_plot_tools(self):
-        """Test that handler is registered and can be called for plot tools."""
-        from mcp import types
-        
-        # Verify handler is registered
-        assert types.CallToolRequest in mcp._mcp_server.request_handlers
-        handler = mcp._mcp_server.request_handlers[types.CallToolRequest]
-        assert handler is not None
-        assert callable(handler)
+        app = FastMCP("Math")
+        stock_handler = app._mcp_server.request_handlers[types.CallToolRequest]
+        monkeypatch.setenv("MCP_TRANSPORT", "stdio")
+        with patch.object(server, "mcp", app), patch.object(app, "run"), patch("sys.stderr"):
+            main()
+
+        assert app._mcp_server.request_handlers[types.CallToolRequest] is stock_handler
+
+    @patch("uvicorn.run")
+    def test_handler_attached_for_http(self, mock_uvicorn, monkeypatch):
+        """Test that main() wraps the CallTool handler when serving HTTP."""
+        from mcp.server.fastmcp import FastMCP
+
+        app = FastMCP("Math")
+        stock_handler = app._mcp_server.request_handlers[types.CallToolRequest]
+        monkeypatch.setenv("MCP_TRANSPORT", "streamable-http")
+        with patch.object(server, "mcp", app), patch.object(
+            app, "streamable_http_app", return_value=MagicMock(lifespan=MagicMock())
+        ), patch("sys.stderr"):
+            main()
+
+        assert app._mcp_server.request_handlers[types.CallToolRequest] is not stock_handler
+        assert app._mcp_server._plot_url_handler_installed
+        mock_uvicorn.assert_called_once()
+
+    def test_handler_attached_only_once(self, plot_url_app):
+        """Test that attaching the handler again does not wrap it a second time."""
+        handler = plot_url_app._mcp_server.request_handlers[types.CallToolRequest]
+        server._attach_plot_url_handler(plot_url_app)
+        assert plot_url_app._mcp_server.request_handlers[types.CallToolRequest] is handler
+
+    @pytest.mark.slow
+    def test_handler_appends_plot_url_to_content(self, plot_url_app):
+        """Test that the saved plot URL is appended to the plot tool result."""
+        handler = plot_url_app._mcp_server.request_handlers[types.CallToolRequest]
+        req = types.CallToolRequest(
+            method="tools/call",
+            params=types.CallToolRequestParams(
+                name="plot_bar_chart",
+                arguments={"categories": ["a", "b"], "values": [1, 2]},
+            ),
+        )
+        with patch(
+            "math_mcp.plot_output.maybe_save_plot_output",
+            return_value="http://localhost/outputs/chart.png",
+        ):
+            result = asyncio.run(handler(req))
+
+        content = result.root.content
+        assert [item.type for item in content] == ["image", "text"]
+        assert content[-1].text == "Chart available at: http://localhost/outputs/chart.png"
+
+        # Check PNG framing and the IHDR dimensions without decoding the image data
+        png = base64.b64decode(content[0].data)
+        assert png.startswith(b"\x89PNG\r\n\x1a\n") and png.endswith(b"IEND\xaeB`\x82")
+        width, height = struct.unpack_from(">II", png, 16)
+        assert width > 0 and height > 0
+
+    @pytest.mark.slow
+    def test_handler_rebuilds_result_when_model_frozen(self, plot_url_app):
+        """Test that the plot URL is still appended when CallToolResult is frozen."""
+        handler = plot_url_app._mcp_server.request_handlers[types.CallToolRequest]
+        req = types.CallToolRequest(
+            method="tools/call",
+            params=types.CallToolRequestParams(
+                name="plot_bar_chart",
+                arguments={"categories": ["a", "b"], "values": [1, 2]},
+            ),
+        )
+        with patch.object(server, "_CTR_MUTABLE", False), patch(
+            "math_mcp.plot_output.maybe_save_plot_output",
+            return_value="http://localhost/outputs/chart.png",
+        ):
+            result = asyncio.run(handler(req))
+
+        content = result.root.content
+        assert [item.type for item in content] == ["image", "text"]
+        assert content[-1].text == "Chart available at: http://localhost/outputs/chart.png"
+
+
+@pytest.fixture
+def mock_http_app(monkeypatch):
+    """HTTP transport environment with mcp.streamable_http_app patched to return a stub app."""
+    monkeypatch.setenv("MCP_TRANSPORT", "streamable-http")
+    monkeypatch.setenv("MCP_HOST", "127.0.0.1")
+    monkeypatch.setenv("MCP_PORT", "8008")
+    with patch("math_mcp.server.mcp.streamable_http_app") as factory:
+        factory.return_value = MagicMock(lifespan=None)
+        yield factory
 
 
 class TestMainFunction:
@@ -125,64 +283,51 @@ class TestMainFunction:
         mock_run.assert_called_once_with(transport="stdio")
 
     @patch("uvicorn.run")
-    @patch("math_mcp.server.mcp.streamable_http_app")
-    @pytest.mark.skipif(
-        not hasattr(mcp, "streamable_http_app"),
-        reason="mcp.streamable_http_app not available",
-    )
-    def test_main_http_transport(self, mock_streamable_app, mock_uvicorn):
+    @pytest.mark.skipif(not _HAS_HTTP, reason="mcp.streamable_http_app not available")
+    def test_main_http_transport(self, mock_uvicorn, mock_http_app):
         """Test main() with HTTP transport."""
-        # Setup mocks
-        mock_app = MagicMock()
-        mock_app.lifespan = None
-        mock_streamable_app.return_value = mock_app
-        
-        with patch.dict(os.environ, {
-            "MCP_TRANSPORT": "streamable-http",
-            "MCP_HOST": "127.0.0.1",
-            "MCP_PORT": "8008"
-        }, clear=False):
-            with patch("sys.exit"):
-                with patch("sys.stderr"):
-                    # If session_manager exists, create a mock run method
-                    # Otherwise, the code will raise RuntimeError which we handle
-                    try:
-                        main()
-                    except (RuntimeError, AttributeError):
-                        # Expected if session_manager is missing or not mockable
-                        pass
-        
+        with patch("sys.exit"), patch("sys.stderr"):
+            # If session_manager exists, create a mock run method
+            # Otherwise, the code will raise RuntimeError which we handle
+            try:
+                main()
+            except (RuntimeError, AttributeError):
+                # Expected if session_manager is missing or not mockable
+                pass
+
         # Verify streamable_http_app was called
-        mock_streamable_app.assert_called_once()
+        mock_http_app.assert_called_once()
 
     @patch("uvicorn.run")
-    @patch("math_mcp.server.mcp.streamable_http_app")
-    @pytest.mark.skipif(
-        not hasattr(mcp, "streamable_http_app"),
-        reason="mcp.streamable_http_app not available",
-    )
-    def test_main_http_transport_with_lifespan(self, mock_streamable_app, mock_uvicorn):
+    @pytest.mark.skipif(not _HAS_HTTP, reason="mcp.streamable_http_app not available")
+    def test_main_http_transport_with_lifespan(self, mock_uvicorn, mock_http_app, monkeypatch):
         """Test main() with HTTP transport when app has lifespan."""
-        # Setup mocks
-        mock_app = MagicMock()
-        mock_lifespan = MagicMock()
-        mock_app.lifespan = mock_lifespan
-        mock_streamable_app.return_value = mock_app
-        
-        with patch.dict(os.environ, {
-            "MCP_TRANSPORT": "http",
-            "MCP_HOST": "0.0.0.0",
-            "MCP_PORT": "8008"
-        }, clear=False):
-            with patch("sys.exit"):
-                with patch("sys.stderr"):
-                    main()
-        
+        monkeypatch.setenv("MCP_TRANSPORT", "http")
+        monkeypatch.setenv("MCP_HOST", "0.0.0.0")
+        mock_http_app.return_value.lifespan = MagicMock()
+
+        with patch("sys.exit"), patch("sys.stderr"):
+            main()
+
         # Verify streamable_http_app was called
-        mock_streamable_app.assert_called_once()
+        mock_http_app.assert_called_once()
         # Verify uvicorn.run was called
         mock_uvicorn.assert_called_once()
 
+    @patch("math_mcp.server.mcp.run")
+    def test_main_starts_kernel_warm_up_in_background(self, mock_run, monkeypatch):
+        """Test that main() hands the stats kernel warm-up to a daemon thread."""
+        monkeypatch.setenv("MCP_TRANSPORT", "stdio")
+        with patch.object(server.stats_kernels, "HAS_NUMBA", True), patch(
+            "threading.Thread"
+        ) as mock_thread, patch("sys.stderr"):
+            main()
+
+        mock_thread.assert_called_once_with(
+            target=server.stats_kernels.warm_up, name="math-mcp-kernel-warm-up", daemon=True
+        )
+        mock_thread.return_value.start.assert_called_once()
+
     @patch("math_mcp.server.mcp.run")
     def test_main_handles_exceptions(self, mock_run):
         """Test that main() handles exceptions gracefully."""
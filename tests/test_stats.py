@@ -1,13 +1,12 @@
 """Tests for statistical tools."""
 
 import json
-import sys
-from pathlib import Path
+from unittest.mock import patch
 
+import numpy as np
+import pytest
 
-# Add src to path for imports (needed for src-layout packages)
-sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
-
+from math_mcp import stats_kernels
 from math_mcp.stats_tools import (
     tool_correlation,
     tool_describe_data,
@@ -16,21 +15,27 @@ from math_mcp.stats_tools import (
     tool_ttest,
 )
 
+# Keys each tool's JSON result must contain
+_DESCRIBE_KEYS = frozenset(
+    {"count", "mean", "median", "std", "variance", "min", "max", "range", "percentiles"}
+)
+_TTEST_KEYS = frozenset({"statistic", "pvalue", "degrees_of_freedom", "significant", "test_type"})
+_CORRELATION_KEYS = frozenset({"correlation", "pvalue", "method"})
+_REGRESSION_KEYS = frozenset({"slope", "intercept", "r_squared", "pvalue", "equation"})
+_MOVING_AVERAGE_KEYS = frozenset({"smoothed", "original", "window", "method"})
+
+
+def _require(data, keys):
+    missing = keys - data.keys()
+    assert not missing, f"missing keys: {sorted(missing)}"
+
 
 class TestDescribeData:
     def test_basic_statistics(self):
         result = tool_describe_data([120, 145, 167, 123, 189, 134])
         data = json.loads(result)
         
-        assert "count" in data
-        assert "mean" in data
-        assert "median" in data
-        assert "std" in data
-        assert "variance" in data
-        assert "min" in data
-        assert "max" in data
-        assert "range" in data
-        assert "percentiles" in data
+        _require(data, _DESCRIBE_KEYS)
         
         assert data["count"] == 6
         assert data["min"] == 120
@@ -45,7 +50,7 @@ class TestDescribeData:
         assert "p99" in data["percentiles"]
         
         # p50 should equal median
-        assert abs(data["percentiles"]["p50"] - data["median"]) < 1e-10
+        assert data["percentiles"]["p50"] == pytest.approx(data["median"], rel=0, abs=1e-10)
 
     def test_single_value(self):
         result = tool_describe_data([42])
@@ -63,6 +68,67 @@ class TestDescribeData:
         result = tool_describe_data([])
         assert "Error" in result
 
+    def test_small_and_numpy_paths_agree(self):
+        values = np.random.default_rng(8).normal(100.0, 15.0, 31).tolist()
+        small = json.loads(tool_describe_data(values))
+        with patch("math_mcp.stats_tools._PURE_PYTHON_MAX_SIZE", 0):
+            vectorized = json.loads(tool_describe_data(values))
+
+        for key in ("mean", "median", "std", "variance", "min", "max", "range"):
+            assert abs(small[key] - vectorized[key]) < 1e-9
+        for key, value in vectorized["percentiles"].items():
+            assert abs(small["percentiles"][key] - value) < 1e-9
+
+    @pytest.mark.parametrize(
+        "values",
+        [
+            [1e200, -1e200],
+            [1e308, 1e308],
+            [1e308, -1e308, 5.0],
+            [float("inf"), float("-inf"), 1.0],
+            [1.0, float("nan"), 3.0],
+            [float("nan")],
+            np.random.default_rng(9).normal(100.0, 15.0, 27).tolist(),
+        ],
+    )
+    def test_small_path_json_matches_numpy_path(self, values):
+        small = tool_describe_data(values)
+        with patch("math_mcp.stats_tools._PURE_PYTHON_MAX_SIZE", 0):
+            vectorized = tool_describe_data(values)
+        assert small == vectorized
+
+    def test_nan_propagates_to_min_and_max(self):
+        data = json.loads(tool_describe_data([1.0, float("nan"), 3.0]))
+        assert np.isnan(data["min"])
+        assert np.isnan(data["max"])
+
+    def test_large_dataset_matches_numpy(self):
+        values = np.random.default_rng(0).normal(100.0, 15.0, 20_000)
+        data = json.loads(tool_describe_data(values.tolist()))
+
+        assert data["count"] == 20_000
+        assert abs(data["mean"] - np.mean(values)) < 1e-9
+        assert abs(data["variance"] - np.var(values, ddof=1)) < 1e-6
+        assert data["min"] == np.min(values)
+        assert data["max"] == np.max(values)
+
+    def test_large_dataset_percentiles_match_numpy(self):
+        values = np.random.default_rng(7).exponential(120.0, 1_001)
+        data = json.loads(tool_describe_data(values.tolist()))
+
+        expected = np.percentile(values, [25, 50, 75, 95, 99])
+        actual = [data["percentiles"][k] for k in ("p25", "p50", "p75", "p95", "p99")]
+        assert np.allclose(actual, expected, rtol=1e-12)
+        assert data["median"] == data["percentiles"]["p50"]
+
+    def test_large_dataset_with_nan_reports_nan_percentiles(self):
+        values = np.arange(300.0)
+        values[5] = np.nan
+        data = json.loads(tool_describe_data(values.tolist()))
+
+        assert np.isnan(data["median"])
+        assert all(np.isnan(p) for p in data["percentiles"].values())
+
     def test_percentiles_correct(self):
         # Test with known values
         result = tool_describe_data([1, 2, 3, 4, 5, 6, 7, 8, 9, 10])
@@ -72,6 +138,81 @@ class TestDescribeData:
         assert 5.0 <= data["percentiles"]["p50"] <= 6.0
 
 
+class TestStatsKernels:
+    def test_describe_moments_matches_numpy(self):
+        values = np.random.default_rng(1).uniform(-50.0, 50.0, 1_000)
+        mean, variance, min_val, max_val = stats_kernels.describe_moments(values)
+
+        assert abs(mean - np.mean(values)) < 1e-10
+        assert abs(variance - np.var(values, ddof=1)) < 1e-8
+        assert min_val == np.min(values)
+        assert max_val == np.max(values)
+
+    def test_describe_moments_propagates_nan(self):
+        values = np.random.default_rng(2).uniform(-50.0, 50.0, 1_000)
+        values[500] = np.nan
+        _, _, min_val, max_val = stats_kernels.describe_moments(values)
+
+        assert np.isnan(min_val)
+        assert np.isnan(max_val)
+
+    @pytest.mark.skipif(not stats_kernels.HAS_NUMBA, reason="numba not installed")
+    def test_large_dataset_with_nan_reports_nan_min_max(self):
+        values = np.random.default_rng(2).normal(100.0, 15.0, 20_000)
+        values[10_000] = np.nan
+        data = json.loads(tool_describe_data(values.tolist()))
+
+        assert np.isnan(data["min"])
+        assert np.isnan(data["max"])
+
+    def test_describe_moments_single_value(self):
+        assert stats_kernels.describe_moments(np.array([42.0])) == (42.0, 0.0, 42.0, 42.0)
+
+    def test_ttest_ind_statistic_matches_scipy(self):
+        from scipy import stats
+
+        a = np.array([100.0, 102.0, 98.0, 105.0])
+        b = np.array([95.0, 97.0, 99.0, 94.0])
+        expected = stats.ttest_ind(a, b).statistic
+        assert abs(stats_kernels.ttest_ind_statistic(a, b) - expected) < 1e-12
+
+    def test_ttest_ind_statistic_constant_samples(self):
+        assert stats_kernels.ttest_ind_statistic(np.ones(3), np.zeros(3)) == np.inf
+        assert np.isnan(stats_kernels.ttest_ind_statistic(np.ones(3), np.ones(3)))
+
+    def test_regression_moments_matches_numpy(self):
+        rng = np.random.default_rng(6)
+        x = rng.normal(size=500)
+        y = 2.0 * x + rng.normal(size=500)
+        x_mean, y_mean, ssx, ssy, ssxy = stats_kernels.regression_moments(x, y)
+
+        dx = x - x.mean()
+        dy = y - y.mean()
+        assert np.allclose([x_mean, y_mean], [x.mean(), y.mean()])
+        assert np.allclose([ssx, ssy, ssxy], [dx @ dx, dy @ dy, dx @ dy])
+
+    def test_ewma_matches_recurrence(self):
+        values = np.array([10.0, 12.0, 11.0, 15.0, 13.0])
+        alpha = 0.5
+        expected = [values[0]]
+        for x in values[1:]:
+            expected.append(alpha * x + (1 - alpha) * expected[-1])
+
+        assert np.allclose(stats_kernels.ewma(values, alpha), expected)
+
+    @pytest.mark.skipif(not stats_kernels.HAS_NUMBA, reason="numba not installed")
+    def test_warm_up_compiles_every_kernel(self):
+        stats_kernels.warm_up()
+
+        for kernel in (
+            stats_kernels.describe_moments,
+            stats_kernels.ewma,
+            stats_kernels.ttest_ind_statistic,
+            stats_kernels.regression_moments,
+        ):
+            assert kernel.signatures
+
+
 class TestTtest:
     def test_two_sample_ttest(self):
         result = tool_ttest(
@@ -80,11 +221,7 @@ class TestTtest:
         )
         data = json.loads(result)
         
-        assert "statistic" in data
-        assert "pvalue" in data
-        assert "degrees_of_freedom" in data
-        assert "significant" in data
-        assert "test_type" in data
+        _require(data, _TTEST_KEYS)
         
         assert data["test_type"] == "two-sample"
         assert isinstance(data["significant"], bool)
@@ -118,6 +255,19 @@ class TestTtest:
         data = json.loads(result)
         assert "pvalue" in data
 
+    def test_large_samples_match_scipy(self):
+        from scipy import stats
+
+        rng = np.random.default_rng(3)
+        a = rng.normal(10.0, 2.0, 6_000)
+        b = rng.normal(10.1, 2.0, 6_000)
+        for alternative in ("two-sided", "greater", "less"):
+            data = json.loads(tool_ttest(a.tolist(), b.tolist(), alternative=alternative))
+            expected = stats.ttest_ind(a, b, alternative=alternative)
+            assert abs(data["statistic"] - expected.statistic) < 1e-9
+            assert abs(data["pvalue"] - expected.pvalue) < 1e-9
+            assert data["degrees_of_freedom"] == 11_998
+
     def test_empty_sample(self):
         result = tool_ttest(sample1=[], sample2=None)
         assert "Error" in result
@@ -131,6 +281,12 @@ class TestTtest:
         assert "Error" in result
 
 
+@pytest.fixture(scope="module")
+def xy_linear():
+    """Exactly linear data (y = 2x), shared by the perfect-fit tests; treat as read-only."""
+    return [1, 2, 3, 4], [2, 4, 6, 8]
+
+
 class TestCorrelation:
     def test_pearson_correlation(self):
         result = tool_correlation(
@@ -140,22 +296,57 @@ class TestCorrelation:
         )
         data = json.loads(result)
         
-        assert "correlation" in data
-        assert "pvalue" in data
-        assert "method" in data
+        _require(data, _CORRELATION_KEYS)
         assert data["method"] == "pearson"
         assert -1.0 <= data["correlation"] <= 1.0
 
-    def test_perfect_correlation(self):
+    def test_perfect_correlation(self, xy_linear):
         # Perfect positive correlation
-        result = tool_correlation(
-            x_data=[1, 2, 3, 4],
-            y_data=[2, 4, 6, 8],
-            method="pearson",
-        )
+        x, y = xy_linear
+        result = tool_correlation(x_data=x, y_data=y, method="pearson")
         data = json.loads(result)
         assert abs(data["correlation"] - 1.0) < 1e-10
 
+    def test_pearson_matches_scipy(self):
+        from scipy import stats
+
+        rng = np.random.default_rng(4)
+        x = rng.normal(size=50)
+        y = 0.3 * x + rng.normal(size=50)
+        data = json.loads(tool_correlation(x.tolist(), y.tolist(), method="pearson"))
+
+        expected = stats.pearsonr(x, y)
+        assert abs(data["correlation"] - expected.statistic) < 1e-12
+        assert abs(data["pvalue"] - expected.pvalue) < 1e-12
+
+    def test_constant_data_reports_nan(self):
+        result = tool_correlation([1, 2, 3], [5, 5, 5], method="pearson")
+        assert result == '{"correlation": NaN, "pvalue": NaN, "method": "pearson"}'
+
+    def test_pearson_nan_input_reports_nan(self):
+        result = tool_correlation([1, 2, float("nan"), 4], [2, 3, 4, 5], method="pearson")
+        assert result == '{"correlation": NaN, "pvalue": NaN, "method": "pearson"}'
+
+    def test_pearson_large_magnitude_matches_scipy(self):
+        from scipy import stats
+
+        x = [-5e210, 5e210, 3e200, -3e200]
+        y = [1.0, 2.0, 3.0, 4.0]
+        data = json.loads(tool_correlation(x, y, method="pearson"))
+
+        expected = stats.pearsonr(x, y)
+        assert data["correlation"] == pytest.approx(expected.statistic, rel=1e-12)
+        assert data["pvalue"] == pytest.approx(expected.pvalue, rel=1e-12)
+
+    def test_pearson_two_points(self):
+        data = json.loads(tool_correlation([1, 2], [3, 1], method="pearson"))
+        assert data["correlation"] == -1.0
+        assert data["pvalue"] == 1.0
+
+    def test_pearson_single_point(self):
+        result = tool_correlation([1], [2], method="pearson")
+        assert "Error" in result
+
     def test_spearman_correlation(self):
         result = tool_correlation(
             x_data=[1, 2, 3, 4, 5],
@@ -166,12 +357,9 @@ class TestCorrelation:
         assert data["method"] == "spearman"
         assert -1.0 <= data["correlation"] <= 1.0
 
-    def test_kendall_correlation(self):
-        result = tool_correlation(
-            x_data=[1, 2, 3, 4],
-            y_data=[2, 4, 6, 8],
-            method="kendall",
-        )
+    def test_kendall_correlation(self, xy_linear):
+        x, y = xy_linear
+        result = tool_correlation(x_data=x, y_data=y, method="kendall")
         data = json.loads(result)
         assert data["method"] == "kendall"
         assert -1.0 <= data["correlation"] <= 1.0
@@ -198,24 +386,26 @@ class TestCorrelation:
 
 
 class TestLinearRegression:
-    def test_perfect_linear_fit(self):
-        result = tool_linear_regression(
-            x_data=[1, 2, 3, 4],
-            y_data=[2, 4, 6, 8],
-        )
+    def test_perfect_linear_fit(self, xy_linear):
+        x, y = xy_linear
+        result = tool_linear_regression(x_data=x, y_data=y)
         data = json.loads(result)
         
-        assert "slope" in data
-        assert "intercept" in data
-        assert "r_squared" in data
-        assert "pvalue" in data
-        assert "equation" in data
+        _require(data, _REGRESSION_KEYS)
         
         # Perfect fit should have R² = 1.0 and slope = 2
         assert abs(data["r_squared"] - 1.0) < 1e-10
         assert abs(data["slope"] - 2.0) < 1e-10
         assert "y = " in data["equation"]
 
+    def test_constant_y_reports_nan_fit_quality(self):
+        result = tool_linear_regression(x_data=[1, 2, 3], y_data=[5, 5, 5])
+        assert '"r_squared": NaN, "pvalue": NaN' in result
+
+    def test_nan_input_reports_nan_fit_quality(self):
+        result = tool_linear_regression(x_data=[1, 2, 3, 4], y_data=[2, float("nan"), 6, 8])
+        assert '"r_squared": NaN, "pvalue": NaN' in result
+
     def test_linear_growth(self):
         result = tool_linear_regression(
             x_data=[1, 2, 3, 4, 5],
@@ -226,6 +416,26 @@ class TestLinearRegression:
         assert abs(data["slope"] - 5.0) < 0.1  # Should be around 5
         assert data["r_squared"] > 0.9  # High correlation
 
+    def test_matches_scipy(self):
+        from scipy import stats
+
+        rng = np.random.default_rng(5)
+        for n in (40, 20_000):
+            x = rng.uniform(0.0, 100.0, n)
+            y = 3.0 * x - 7.0 + rng.normal(0.0, 25.0, n)
+            data = json.loads(tool_linear_regression(x.tolist(), y.tolist()))
+
+            expected = stats.linregress(x, y)
+            assert abs(data["slope"] - expected.slope) < 1e-9
+            assert abs(data["intercept"] - expected.intercept) < 1e-7
+            assert abs(data["r_squared"] - expected.rvalue ** 2) < 1e-12
+            assert abs(data["pvalue"] - expected.pvalue) < 1e-12
+
+    def test_identical_x_values(self):
+        result = tool_linear_regression(x_data=[2, 2, 2], y_data=[1, 2, 3])
+        assert "Error" in result
+        assert "identical" in result
+
     def test_mismatched_lengths(self):
         result = tool_linear_regression(
             x_data=[1, 2, 3],
@@ -256,15 +466,25 @@ class TestMovingAverage:
         )
         data = json.loads(result)
         
-        assert "smoothed" in data
-        assert "original" in data
-        assert "window" in data
-        assert "method" in data
+        _require(data, _MOVING_AVERAGE_KEYS)
         
         assert data["window"] == 3
         assert data["method"] == "simple"
         assert len(data["smoothed"]) == len(data["original"])
 
+    def test_simple_matches_convolution(self):
+        values = np.random.default_rng(2).normal(50.0, 5.0, 500)
+        window = 30
+        data = json.loads(tool_moving_average(data=values.tolist(), window=window))
+
+        expected = np.convolve(values, np.ones(window) / window, mode="valid")
+        assert np.allclose(data["smoothed"][window - 1:], expected)
+        assert np.allclose(data["smoothed"][:window - 1], expected[0])
+
+    def test_simple_after_large_leading_value(self):
+        data = json.loads(tool_moving_average(data=[1e17, 1, 2, 3, 4], window=2))
+        assert data["smoothed"][2:] == [1.5, 2.5, 3.5]
+
     def test_exponential_moving_average(self):
         result = tool_moving_average(
             data=[10, 12, 11, 15, 13, 14, 12],
@@ -316,8 +536,8 @@ class TestMovingAverage:
         data = json.loads(result)
         
         # Smoothed should generally have lower variance (sanity check)
-        import numpy as np
         orig_var = np.var(noisy_data)
-        smooth_var = np.var([x for x in data["smoothed"] if not np.isnan(x)])
+        smoothed = np.asarray(data["smoothed"], dtype=float)
+        smooth_var = np.var(smoothed[~np.isnan(smoothed)])
         assert smooth_var <= orig_var
         assert len(data["smoothed"]) == len(noisy_data)